@@ -0,0 +1,79 @@
+# Benchmarks recalculating many portfolios kept in files, each with a
+# synthetic ledger, with a number of worker processes.
+#
+# Usage: python -m benchmarks.cli [--portfolios 8] [--size 100000] [--workers 1 4]
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.positions import make_trades
+from stonks.cli import main as cli_main
+from stonks.files import FileWorkbook
+from stonks.mapping import TABLE_INDEXES
+
+_FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+_DATES = {"rights": ["start", "end", "settlement", "issue_date"]}
+
+
+# A portfolio with the corporate actions used by tests and a synthetic ledger
+# besides the trades used by tests.
+def make_portfolio(path: Path, size: int) -> None:
+    wb = FileWorkbook(path)
+
+    for name in ["rights", "splits", "mergers", "spin_offs", "stock_dividends"]:
+        df = pd.read_csv(
+            _FIXTURES / f"{name.replace('_', '-')}.csv",
+            parse_dates=["date", *_DATES.get(name, [])],
+            index_col=TABLE_INDEXES[name],
+        )
+        getattr(wb, name).replace_with_df(df, index=True)
+
+    trades = pd.read_csv(
+        _FIXTURES / "trades.csv", parse_dates=["date"], index_col=TABLE_INDEXES["trades"]
+    )
+    trades_costs = pd.read_csv(
+        _FIXTURES / "trades-costs.csv", parse_dates=["date"], index_col=TABLE_INDEXES["trades"]
+    )
+    trades = pd.concat([make_trades(size), trades.combine_first(trades_costs)[trades.columns]])
+    wb.trades.replace_with_df(trades, index=True)
+
+    (path / "inputs.json").write_text(json.dumps({"positions": {"date": "2100-01-01"}}))
+
+
+def measure(portfolios: list[Path], workers: int) -> float:
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert cli_main([*map(str, portfolios), "--workers", str(workers)]) == 0
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--portfolios", type=int, default=8)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        portfolios = [Path(tmp) / f"portfolio-{n}" for n in range(args.portfolios)]
+
+        for path in portfolios:
+            make_portfolio(path, args.size)
+
+        print(f"{'portfolios':>10} {'workers':>8} {'seconds':>8}")
+
+        for workers in args.workers:
+            elapsed = measure(portfolios, workers)
+            print(f"{args.portfolios:>10} {workers:>8} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Benchmarks the latency of a handler as seen by Excel, which starts a new
+# Python process for every event:
+#
+# - cold: the process imports stonks.xlwings and runs the handler
+# - warm: the process runs the thin client (stonks.remote), and the handler
+#   runs in a daemon started beforehand
+#
+# Handlers run on a stand-in for xlwings and always recalculate.
+#
+# Usage: python -m benchmarks.daemon [--size 1000] [--runs 5]
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import stonks.xlwings
+from benchmarks.excel import make_tables
+from stonks.daemon import Daemon
+from stonks.fingerprints import Fingerprints
+from tests.fake_xlwings import make_book
+
+_CLIENT = """
+import sys
+from pathlib import Path
+
+import stonks.remote
+
+stonks.remote.DAEMON_PATH = Path(sys.argv[1])
+stonks.remote.call("on_us_dividends_update", "benchmark")
+"""
+
+
+class _NoFingerprints(Fingerprints):
+    def get(self, table_name: str) -> str | None:
+        return None
+
+
+def _wall_time(*args: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    dividends, ptax = make_tables(args.size)
+    book, _ = make_book({"us_dividends": dividends, "ptax": ptax})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stonks.xlwings._fingerprints = _NoFingerprints(Path(tmp) / "fingerprints.json")
+        daemon = Daemon(Path(tmp) / "daemon.json", open_book=lambda name: book)
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+
+        imports, handlers, warm = [], [], []
+
+        for _ in range(args.runs):
+            imports.append(_wall_time("-c", "import stonks.xlwings"))
+
+            start = time.perf_counter()
+            stonks.xlwings.on_us_dividends_update(book)
+            handlers.append(time.perf_counter() - start)
+
+            warm.append(_wall_time("-c", _CLIENT, str(daemon.path)))
+
+        daemon.close()
+        thread.join()
+
+    cold = [i + h for i, h in zip(imports, handlers, strict=True)]
+
+    print(f"{'':>8} {'median':>8} {'min':>8}")
+
+    for name, times in [("import", imports), ("handler", handlers), ("cold", cold), ("warm", warm)]:
+        print(f"{name:>8} {statistics.median(times):>8.3f} {min(times):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
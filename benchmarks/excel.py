@@ -0,0 +1,119 @@
+# Benchmarks writing calculation results back to Excel with a stand-in for
+# xlwings that takes a configurable latency on every call to Excel.
+#
+# Results are written one column at a time, as Table.update_from_df used to
+# do, and as blocks of adjacent columns.
+#
+# With --replace, benchmarks instead replacing a PTAX table where a few rows
+# changed, rewriting the whole table, as Table.replace_with_df used to do, and
+# writing only the changed rows.
+#
+# Usage: python -m benchmarks.excel [--sizes 100 10000] [--latency 0.01] [--replace 3]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from stonks.calculations import calc_us_dividends
+from stonks.excel import Workbook
+from stonks.mapping import SHEET_NAMES
+from tests.fake_xlwings import make_book
+
+
+def make_ptax(days: pd.DatetimeIndex) -> DataFrame:
+    return DataFrame(
+        {"buying_rate": np.linspace(2, 6, len(days)), "selling_rate": np.linspace(2, 6, len(days))},
+        index=days,
+    )
+
+
+def make_tables(size: int) -> tuple[DataFrame, DataFrame]:
+    days = pd.date_range("2014-01-01", "2023-12-31", name="date")
+    ptax = make_ptax(days)
+    amount = np.full(size, 10.0)
+    dividends = DataFrame(
+        {
+            "symbol": "AAA",
+            "amount": amount,
+            "taxes": amount * 0.3,
+            "total": amount * 0.7,
+            "ptax": np.nan,
+            "amount_brl": np.nan,
+            "taxes_brl": np.nan,
+            "total_brl": np.nan,
+        },
+        index=pd.Index(np.sort(np.random.default_rng(0).choice(days[31:], size)), name="date"),
+    )
+
+    return dividends, ptax
+
+
+def measure(size: int, latency: float, per_column: bool) -> tuple[float, int]:
+    dividends, ptax = make_tables(size)
+    book, excel = make_book({"us_dividends": dividends, "ptax": ptax}, latency=latency)
+    wb = Workbook(book)
+    results = calc_us_dividends(wb.us_dividends.to_df(), wb.ptax.to_df())
+
+    excel.calls = 0
+    start = time.perf_counter()
+
+    if per_column:
+        for column in results.columns:
+            wb.us_dividends.update_from_df(results[[column]])
+    else:
+        wb.us_dividends.update_from_df(results)
+
+    return time.perf_counter() - start, excel.calls
+
+
+def measure_replace(size: int, latency: float, changed: int, full: bool) -> tuple[float, int, int]:
+    ptax = make_ptax(pd.date_range("2000-01-01", periods=size, name="date"))
+    book, excel = make_book({"ptax": ptax}, latency=latency)
+    wb = Workbook(book)
+    wb.ptax.to_df()
+
+    new_ptax = ptax.copy()
+    new_ptax.iloc[-changed:] += 0.01
+
+    excel.calls = excel.cells = 0
+    start = time.perf_counter()
+
+    if full:
+        book.sheets[SHEET_NAMES["ptax"]].tables["ptax"].update(new_ptax.rename_axis("Data"))
+    else:
+        wb.ptax.replace_with_df(new_ptax, index=True)
+
+    return time.perf_counter() - start, excel.calls, excel.cells
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--replace", type=int)
+    args = parser.parse_args()
+
+    if args.replace:
+        print(f"{'rows':>8} {'mode':>10} {'calls':>6} {'cells':>8} {'seconds':>8}")
+
+        for size in args.sizes:
+            for mode in ("full", "delta"):
+                elapsed, calls, cells = measure_replace(
+                    size, args.latency, args.replace, mode == "full"
+                )
+                print(f"{size:>8} {mode:>10} {calls:>6} {cells:>8} {elapsed:>8.3f}")
+
+        return
+
+    print(f"{'rows':>8} {'mode':>10} {'calls':>6} {'seconds':>8}")
+
+    for size in args.sizes:
+        for mode in ("per column", "blocks"):
+            elapsed, calls = measure(size, args.latency, mode == "per column")
+            print(f"{size:>8} {mode:>10} {calls:>6} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
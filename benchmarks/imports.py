@@ -0,0 +1,84 @@
+# Benchmarks importing stonks.xlwings, which Excel does for every event unless
+# the daemon is running, with `python -X importtime`. Prints the median time
+# of each stonks module and of the largest dependencies it imports.
+#
+# Exits with status 1 when the stonks modules take longer than the budget.
+#
+# Usage: python -m benchmarks.imports [--module stonks.xlwings] [--runs 5] [--top 10]
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Budget for the time spent running the modules of stonks themselves (not
+# pandas or xlwings) when Excel imports stonks.xlwings. It was about 20 ms when
+# lazy imports were introduced. tests/test_imports.py checks it too, with more
+# room for loaded machines.
+STONKS_BUDGET_MS = 50
+
+
+# Self and cumulative microseconds by module, as reported by -X importtime.
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    times = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="stonks.xlwings")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    self_ms: dict[str, list[float]] = defaultdict(list)
+    cumulative_ms: dict[str, list[float]] = defaultdict(list)
+
+    for times in runs:
+        for name, (self_us, cumulative_us) in times.items():
+            self_ms[name].append(self_us / 1000)
+            cumulative_ms[name].append(cumulative_us / 1000)
+
+    top_level = sorted(
+        (name for name in cumulative_ms if "." not in name and name != "stonks"),
+        key=lambda name: -statistics.median(cumulative_ms[name]),
+    )[: args.top]
+    stonks = sorted(name for name in self_ms if name.split(".")[0] == "stonks")
+
+    print(f"{'module':<24} {'self ms':>8} {'cumul. ms':>10}")
+
+    for name in [*stonks, *top_level]:
+        self_median = statistics.median(self_ms[name])
+        print(f"{name:<24} {self_median:>8.1f} {statistics.median(cumulative_ms[name]):>10.1f}")
+
+    stonks_ms = [
+        sum(self_us for name, (self_us, _) in times.items() if name in stonks) / 1000
+        for times in runs
+    ]
+    total_ms = [times[args.module][1] / 1000 for times in runs]
+
+    print(f"{'stonks (self)':<24} {statistics.median(stonks_ms):>8.1f}")
+    print(f"{'total':<24} {'':>8} {statistics.median(total_ms):>10.1f}")
+
+    if statistics.median(stonks_ms) > STONKS_BUDGET_MS:
+        print(f"stonks modules over the budget of {STONKS_BUDGET_MS} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
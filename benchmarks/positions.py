@@ -0,0 +1,237 @@
+# Benchmarks the replay of events in calc_positions with a synthetic ledger.
+#
+# Usage: python -m benchmarks.positions [--sizes 10000 100000 1000000]
+#        [--engines iterrows itertuples] [--workers 4] [--checkpoints | --store | --concat]
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Self, cast
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import stonks.positions
+from stonks.calculations import calc_positions
+from stonks.checkpoints import Checkpoints
+from stonks.events import Engine, concat_events, replay
+
+
+# Builds a ledger with `size` trades spread across `size / 1000` symbols. Each
+# symbol repeats the pattern buy, buy, sell so positions never close.
+def make_trades(size: int) -> DataFrame:
+    i = np.arange(size)
+    symbols = max(10, size // 1000)
+    quantity = np.full(size, 100.0)
+    price = 10.0 + (i % 97) / 10
+    amount = quantity * price
+
+    return DataFrame(
+        {
+            "date": pd.Timestamp("2000-01-01") + pd.to_timedelta(i // symbols, unit="D"),
+            "broker": "Acme",
+            "symbol": [f"S{n:05d}" for n in i % symbols],
+            "type": np.where((i // symbols) % 3 == 2, "sell", "buy"),
+            "quantity": quantity,
+            "price": price,
+            "costs": 0.0,
+            "amount": amount,
+        }
+    ).set_index(["date", "broker"])
+
+
+def empty(index: list[str], columns: dict[str, str]) -> DataFrame:
+    dtypes = {"date": "datetime64[ns]"} | {name: "object" for name in index[1:]} | columns
+
+    return DataFrame({name: pd.Series(dtype=dtype) for name, dtype in dtypes.items()}).set_index(
+        index
+    )
+
+
+def corporate_actions() -> dict[str, DataFrame]:
+    return {
+        "rights": empty(
+            ["date", "broker"],
+            {
+                "symbol": "object",
+                "description": "object",
+                "start": "datetime64[ns]",
+                "end": "datetime64[ns]",
+                "settlement": "datetime64[ns]",
+                "shares": "float",
+                "exercised": "float",
+                "price": "float",
+                "amount": "float",
+                "issue_date": "datetime64[ns]",
+            },
+        ),
+        "splits": empty(["date", "symbol"], {"ratio": "object"}),
+        "mergers": empty(["date", "symbol"], {"acquirer": "object", "ratio": "object"}),
+        "spin_offs": empty(
+            ["date", "symbol"],
+            {"new_company": "object", "ratio": "object", "cost_basis": "float"},
+        ),
+        "stock_dividends": empty(["date", "symbol"], {"quantity": "float", "cost": "float"}),
+    }
+
+
+# calc_positions with the ledger and no corporate actions.
+def calc_trades_positions(
+    query_date: date,
+    trades: DataFrame,
+    engine: Engine = "itertuples",
+    checkpoints: Checkpoints | None = None,
+    workers: int | None = None,
+) -> DataFrame:
+    actions = corporate_actions()
+
+    return calc_positions(
+        date=query_date,
+        trades=trades,
+        rights=actions["rights"],
+        splits=actions["splits"],
+        mergers=actions["mergers"],
+        spin_offs=actions["spin_offs"],
+        stock_dividends=actions["stock_dividends"],
+        engine=engine,
+        checkpoints=checkpoints,
+        workers=workers,
+    )
+
+
+def measure(size: int, engine: Engine, workers: int | None = None) -> float:
+    trades = make_trades(size)
+    start = time.perf_counter()
+
+    calc_trades_positions(date.today(), trades, engine=engine, workers=workers)
+
+    return time.perf_counter() - start
+
+
+# Measures how long it takes to move the positions date forward a few days
+# after a first run has saved its checkpoints.
+def measure_checkpoints(size: int) -> tuple[float, float]:
+    trades = make_trades(size)
+    last_date = trades.index.get_level_values("date").max().date()
+    checkpoints = Checkpoints()
+    elapsed = []
+
+    for query_date in [last_date - timedelta(days=3), last_date]:
+        start = time.perf_counter()
+        calc_trades_positions(query_date, trades, checkpoints=checkpoints)
+        elapsed.append(time.perf_counter() - start)
+
+    return elapsed[0], elapsed[1]
+
+
+# Measures the replay of events against the Positions store alone: time,
+# number of Position records allocated and peak memory traced while replaying.
+def measure_store(size: int) -> tuple[float, int, int]:
+    events = concat_events({"trade": make_trades(size)})
+
+    start = time.perf_counter()
+    replay(stonks.positions.Positions(), events)
+    elapsed = time.perf_counter() - start
+
+    allocations = 0
+    position_cls = stonks.positions.Position
+
+    class CountingPosition(position_cls):  # type: ignore[misc,valid-type]
+        __slots__ = ()
+
+        # records are also initialized again by in-place updates, so only
+        # new ones are counted
+        def __new__(cls, *args: float) -> Self:
+            nonlocal allocations
+            allocations += 1
+            return cast(Self, super().__new__(cls))
+
+    stonks.positions.Position = CountingPosition  # type: ignore[misc,assignment]
+    tracemalloc.start()
+
+    try:
+        replay(stonks.positions.Positions(), events)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        stonks.positions.Position = position_cls  # type: ignore[misc]
+
+    return elapsed, allocations, peak
+
+
+# Measures concat_events with two tables sorted by date (merged) and with one
+# of them out of order (sorted from scratch).
+def measure_concat(size: int) -> tuple[float, float]:
+    trades = make_trades(size // 2)
+    stock_dividends = (
+        make_trades(size // 2)
+        .reset_index()
+        .set_index(["date", "symbol"])[["quantity", "price"]]
+        .rename(columns={"price": "cost"})
+    )
+    elapsed = []
+
+    for dividends in [stock_dividends, stock_dividends.iloc[::-1]]:
+        start = time.perf_counter()
+        concat_events({"trade": trades, "stock_dividend": dividends})
+        elapsed.append(time.perf_counter() - start)
+
+    return elapsed[0], elapsed[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=["iterrows", "itertuples"],
+        default=["iterrows", "itertuples"],
+    )
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--checkpoints", action="store_true")
+    parser.add_argument("--store", action="store_true")
+    parser.add_argument("--concat", action="store_true")
+    args = parser.parse_args()
+
+    if args.concat:
+        print(f"{'events':>10} {'sorted':>10} {'unsorted':>10}")
+
+        for size in args.sizes:
+            merged, sorted_ = measure_concat(size)
+            print(f"{size:>10} {merged:>10.3f} {sorted_:>10.3f}")
+
+        return
+
+    if args.store:
+        print(f"{'events':>10} {'seconds':>10} {'records':>10} {'peak MiB':>10}")
+
+        for size in args.sizes:
+            elapsed, allocations, peak = measure_store(size)
+            print(f"{size:>10} {elapsed:>10.3f} {allocations:>10} {peak / 2**20:>10.1f}")
+
+        return
+
+    if args.checkpoints:
+        print(f"{'events':>10} {'first run':>10} {'+3 days':>10}")
+
+        for size in args.sizes:
+            first, forward = measure_checkpoints(size)
+            print(f"{size:>10} {first:>10.3f} {forward:>10.3f}")
+
+        return
+
+    print(f"{'events':>10} {'engine':>12} {'seconds':>10} {'speedup':>8}")
+
+    for size in args.sizes:
+        baseline = None
+
+        for engine in args.engines:
+            elapsed = measure(size, engine, args.workers)
+            baseline = baseline or elapsed
+            print(f"{size:>10} {engine:>12} {elapsed:>10.3f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Benchmarks PTAX downloads against a local stand-in for the BCB service that
+# answers every request after a configurable latency.
+#
+# With --convert, benchmarks instead looking up PTAX rates for a number of
+# transactions with a join, as calc_us_trades used to do, and with PTAXIndex.
+#
+# Usage: python -m benchmarks.ptax [--years 1 5 10] [--latency 0.2] [--workers 1 4 8]
+#        [--currencies USD EUR GBP] [--convert 1000000]
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import stonks.bcb
+from stonks.bcb import fetch_ptax
+from stonks.ptax import PTAXIndex
+from tests.ptax_server import PTAXServer
+
+
+def measure(
+    years: int, latency: float, workers: int, currencies: list[str]
+) -> tuple[float, int, int]:
+    stonks.bcb._PTAX_WORKERS = workers
+    stonks.bcb._client.close()
+
+    with PTAXServer(latency=latency) as server:
+        stonks.bcb._PTAX_URL = server.url
+        stonks.bcb._PTAX_CURRENCY_URL = server.currency_url
+        start = time.perf_counter()
+        fetch_ptax(currencies, date(2024 - years, 1, 1), date(2023, 12, 31))
+        elapsed = time.perf_counter() - start
+        stonks.bcb._client.close()
+
+    return elapsed, len(server.requests), server.connections
+
+
+def measure_convert(size: int) -> tuple[float, float]:
+    days = pd.date_range("2014-01-01", "2023-12-31", name="date")
+    ptax = pd.DataFrame(
+        {"buying_rate": np.linspace(2, 6, len(days)), "selling_rate": np.linspace(2, 6, len(days))},
+        index=days,
+    )
+    trades = pd.DataFrame(
+        {"amount": np.full(size, 100.0)},
+        index=pd.Index(np.random.default_rng(0).choice(days, size), name="date"),
+    )
+
+    start = time.perf_counter()
+    joined = trades.join(ptax.selling_rate, on=["date"]).selling_rate.to_numpy()
+    join_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    looked_up = PTAXIndex(ptax).selling_rates(trades.index)
+    index_elapsed = time.perf_counter() - start
+
+    assert np.array_equal(joined, looked_up)
+
+    return join_elapsed, index_elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--currencies", nargs="+", default=["USD"])
+    parser.add_argument("--convert", type=int)
+    args = parser.parse_args()
+
+    if args.convert:
+        join_elapsed, index_elapsed = measure_convert(args.convert)
+        print(f"{'transactions':>12} {'join':>8} {'index':>8}")
+        print(f"{args.convert:>12} {join_elapsed:>8.3f} {index_elapsed:>8.3f}")
+        return
+
+    print(f"{'years':>6} {'workers':>8} {'requests':>9} {'connections':>12} {'seconds':>8}")
+
+    for years in args.years:
+        for workers in args.workers:
+            elapsed, requests, connections = measure(years, args.latency, workers, args.currencies)
+            print(f"{years:>6} {workers:>8} {requests:>9} {connections:>12} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, timedelta
+from pathlib import Path
 from urllib.parse import urlencode
 
 import pandas as pd
 from pandera.pandas import check_output
 
-from .schemas import PTAX
+from .client import HTTPClient
+from .schemas import PTAX, MultiCurrencyPTAX
+from .store import PTAXStore
 
 _PTAX_URL = "https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+_PTAX_CURRENCY_URL = "https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoMoedaPeriodo(moeda=@moeda,dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
 _PTAX_DATE_FORMAT = "'%m-%d-%Y'"
 _PTAX_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
 _PTAX_DECIMAL = ","
@@ -16,50 +23,262 @@ _PTAX_COLUMNS = {
     "cotacaoCompra": "buying_rate",
     "cotacaoVenda": "selling_rate",
 }
+# bulletin with the closing rates, which are the PTAX rates
+_PTAX_CLOSING_BULLETIN = "Fechamento"
+# long ranges are split in chunks of at most this many days, which are
+# downloaded concurrently by up to `_PTAX_WORKERS` threads
+_PTAX_CHUNK_DAYS = 366
+_PTAX_WORKERS = 4
 
+# shared by all requests, so connections to the BCB are reused
+_client = HTTPClient()
 
-# To calculate the cost basis from USD to BRL for tax filing purposes, it is
-# necessary to obtain the PTAX rates from the Brazilian Central Bank (BCB).
-# These rates represent the official exchange rate between the US dollar and the
-# Brazilian real and are used to determine the value of foreign assets and
-# investments held by Brazilian taxpayers.
+type _Range = tuple[str, date, date]
+
+# date ranges being downloaded into each store and currency, so concurrent
+# fetches (e.g. a background prefetch and a handler) wait for each other's
+# downloads instead of repeating them
+_in_flight: dict[tuple[Path, str], list[tuple[date, date, Future[None]]]] = {}
+_in_flight_lock = threading.Lock()
+
+
+# Downloads PTAX quotes of a currency between start and end dates (inclusive)
+# with a single request. Only dates with quotations are returned, indexed by
+# date.
+#
+# USD quotes come from their own resource, which only has closing rates. Other
+# currencies come from a resource with every bulletin of the day, from which
+# only the closing one is kept.
+def _download_ptax(currency: str, start_date: date, end_date: date) -> pd.DataFrame:
+    params = {
+        "@dataInicial": start_date.strftime(_PTAX_DATE_FORMAT),
+        "@dataFinalCotacao": end_date.strftime(_PTAX_DATE_FORMAT),
+        "$format": "text/csv",
+        "$orderby": "dataHoraCotacao",
+    }
+
+    if currency == "USD":
+        url = f"{_PTAX_URL}?{urlencode(params)}"
+    else:
+        params = {
+            "@moeda": f"'{currency}'",
+            **params,
+            "$filter": f"tipoBoletim eq '{_PTAX_CLOSING_BULLETIN}'",
+        }
+        url = f"{_PTAX_CURRENCY_URL}?{urlencode(params)}"
+
+    body = _client.get(url)
+    ptax = pd.read_csv(io.BytesIO(body), dtype=_PTAX_DTYPES, decimal=_PTAX_DECIMAL)
+
+    if "tipoBoletim" in ptax:
+        ptax = ptax[ptax.tipoBoletim == _PTAX_CLOSING_BULLETIN]
+
+    ptax = ptax[list(_PTAX_COLUMNS)].rename(columns=_PTAX_COLUMNS, errors="raise")
+    ptax["date"] = pd.to_datetime(ptax.date, format=_PTAX_DATETIME_FORMAT).dt.normalize()
+
+    # for some reason there are duplicated entries for 2023-01-31
+    ptax = ptax.drop_duplicates(subset="date", keep="last")
+
+    return ptax.set_index("date")
+
+
+def _chunks(ranges: list[_Range]) -> list[_Range]:
+    chunks = []
+
+    for currency, start_date, end_date in ranges:
+        while start_date <= end_date:
+            chunk_end_date = min(end_date, start_date + timedelta(days=_PTAX_CHUNK_DAYS - 1))
+            chunks.append((currency, start_date, chunk_end_date))
+            start_date = chunk_end_date + timedelta(days=1)
+
+    return chunks
+
+
+# Downloads PTAX quotes for the given currencies and date ranges (inclusive),
+# split in chunks that are downloaded concurrently. Returns each chunk along
+# with its quotes.
+def _download_ptax_chunks(ranges: list[_Range]) -> list[tuple[_Range, pd.DataFrame]]:
+    chunks = _chunks(ranges)
+
+    if len(chunks) <= 1:
+        quotes = [_download_ptax(*chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(_PTAX_WORKERS, len(chunks))) as executor:
+            quotes = list(executor.map(lambda chunk: _download_ptax(*chunk), chunks))
+
+    return list(zip(chunks, quotes))
+
+
+# Joins quotes downloaded in chunks, sorted by date.
+def _stitch(quotes: list[pd.DataFrame]) -> pd.DataFrame:
+    ptax = pd.concat(quotes)
+    # same as above, a duplicated date keeps its last entry
+    ptax = ptax[~ptax.index.duplicated(keep="last")]
+
+    return ptax.sort_index()
+
+
+def _overlaps(ranges: list[tuple[date, date]], start_date: date, end_date: date) -> bool:
+    return any(start <= end_date and end >= start_date for start, end in ranges)
+
+
+# Removes the dates between start and end (inclusive) from the given ranges.
+def _subtract(
+    ranges: list[tuple[date, date]], start_date: date, end_date: date
+) -> list[tuple[date, date]]:
+    results = []
+
+    for start, end in ranges:
+        if start < start_date:
+            results.append((start, min(end, start_date - timedelta(days=1))))
+        if end > end_date:
+            results.append((max(start, end_date + timedelta(days=1)), end))
+
+    return results
+
+
+def _download_ptax_to_store(store: PTAXStore, ranges: list[_Range]) -> None:
+    today = date.today()
+
+    for (currency, chunk_start_date, chunk_end_date), quotes in _download_ptax_chunks(ranges):
+        # today's PTAX is covered once its closing rate, the only one kept, is
+        # published; until then today is requested again next time
+        published = pd.Timestamp(today) in quotes.index
+        covered_end_date = today if published else today - timedelta(days=1)
+        store.save(currency, chunk_start_date, min(chunk_end_date, covered_end_date), quotes)
+
+
+# Marks claimed downloads as done, waking up fetches waiting for them.
+def _release(
+    store: PTAXStore, claimed: list[tuple[_Range, Future[None]]], error: BaseException | None
+) -> None:
+    with _in_flight_lock:
+        for (currency, _, _), future in claimed:
+            in_flight = _in_flight[(store.path, currency)]
+            in_flight[:] = [entry for entry in in_flight if entry[2] is not future]
+
+    for _, future in claimed:
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+# PTAX quotes of each currency between start and end dates (inclusive), all
+# downloaded in a single batch.
+#
+# When `store` is given, only dates not yet covered by it, nor being downloaded
+# into it by another thread, are downloaded.
+def _ptax_quotes(
+    currencies: list[str], start_date: date, end_date: date, store: PTAXStore | None
+) -> dict[str, pd.DataFrame]:
+    if store is None:
+        chunks = _download_ptax_chunks([(c, start_date, end_date) for c in currencies])
+
+        return {
+            currency: _stitch([quotes for (c, _, _), quotes in chunks if c == currency])
+            for currency in currencies
+        }
+
+    claimed: list[tuple[_Range, Future[None]]] = []
+    pending: set[Future[None]] = set()
+
+    with _in_flight_lock:
+        for currency in currencies:
+            in_flight = _in_flight.setdefault((store.path, currency), [])
+            # there are no quotes after today
+            missing = store.missing(currency, start_date, min(end_date, date.today()))
+
+            for in_flight_start, in_flight_end, future in in_flight:
+                if _overlaps(missing, in_flight_start, in_flight_end):
+                    pending.add(future)
+
+                missing = _subtract(missing, in_flight_start, in_flight_end)
+
+            for gap_start, gap_end in missing:
+                future = Future()
+                in_flight.append((gap_start, gap_end, future))
+                claimed.append(((currency, gap_start, gap_end), future))
+
+    try:
+        _download_ptax_to_store(store, [gap for gap, _ in claimed])
+    except BaseException as e:
+        _release(store, claimed, e)
+        raise
+
+    _release(store, claimed, None)
+
+    for future in pending:
+        # raises if the other download failed
+        future.result()
+
+    return {currency: store.quotes(currency, start_date, end_date) for currency in currencies}
+
+
+# To calculate the cost basis of foreign assets in BRL for tax filing purposes,
+# it is necessary to obtain the PTAX rates from the Brazilian Central Bank
+# (BCB). These rates represent the official exchange rate between a foreign
+# currency and the Brazilian real and are used to determine the value of
+# foreign assets and investments held by Brazilian taxpayers.
 #
-# This function returns PTAX rates for the specified date range. Holidays and
-# weekends are filled with the last available rate.
+# This function returns PTAX rates of the given currencies (e.g. USD, EUR,
+# GBP) for the specified date range, indexed by currency and date. Holidays
+# and weekends are filled with the last available rate.
+#
+# When `store` is given, rates already downloaded are read from it and only the
+# missing date ranges are requested.
+#
+# When `quotation_days_only` is True, holidays and weekends are left out and
+# only the start and end dates are filled, so the table still spans the whole
+# range. `PTAXIndex` resolves the dates left out to the same rates.
 #
 # https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/documentacao
-@check_output(PTAX)
-def fetch_ptax_usd(start_date: date, end_date: date) -> pd.DataFrame:
+@check_output(MultiCurrencyPTAX)
+def fetch_ptax(
+    currencies: list[str],
+    start_date: date,
+    end_date: date,
+    store: PTAXStore | None = None,
+    quotation_days_only: bool = False,
+) -> pd.DataFrame:
     if start_date > end_date:
         raise ValueError("start_date must be less than or equal than end_date")
 
     # request an extra week of data to compensate for weekends and holidays that
     # may affect the start date
     req_start_date = start_date - timedelta(days=7)
+    quotes = _ptax_quotes(currencies, req_start_date, end_date, store)
 
-    qs = urlencode(
-        {
-            "@dataInicial": req_start_date.strftime(_PTAX_DATE_FORMAT),
-            "@dataFinalCotacao": end_date.strftime(_PTAX_DATE_FORMAT),
-            "$format": "text/csv",
-            "$orderby": "dataHoraCotacao",
-        }
-    )
-    url = f"{_PTAX_URL}?{qs}"
-
-    ptax = pd.read_csv(url, dtype=_PTAX_DTYPES, decimal=_PTAX_DECIMAL).rename(
-        columns=_PTAX_COLUMNS, errors="raise"
-    )
-    ptax["date"] = pd.to_datetime(ptax.date, format=_PTAX_DATETIME_FORMAT).dt.normalize()
-
-    # for some reason there are duplicated entries for 2023-01-31
-    ptax = ptax.drop_duplicates(subset="date", keep="last")
-    ptax = ptax.set_index("date")
-
-    # slice the data frame to remove extra data
+    # slice the data frames to remove extra data
     # forward fill missing dates, like weekends and holidays with the last
     # available PTAX
     date_range_idx = pd.date_range(name="date", start=start_date, end=end_date, freq="D")
-    ffill_ptax = ptax.reindex(date_range_idx, method="ffill")
+    ffill_ptax = []
+
+    for currency in currencies:
+        dates_idx: pd.Index = date_range_idx
+
+        if quotation_days_only:
+            quotation_dates = pd.DatetimeIndex(quotes[currency].index)
+            in_range = (quotation_dates >= date_range_idx[0]) & (
+                quotation_dates <= date_range_idx[-1]
+            )
+            dates_idx = date_range_idx[[0, -1]].union(quotation_dates[in_range])
+
+        ffill_ptax.append(quotes[currency].reindex(dates_idx, method="ffill"))
+
+    return pd.concat(ffill_ptax, keys=currencies, names=["currency"])
+
+
+# PTAX rates of the US dollar, see `fetch_ptax`.
+@check_output(PTAX)
+def fetch_ptax_usd(
+    start_date: date,
+    end_date: date,
+    store: PTAXStore | None = None,
+    quotation_days_only: bool = False,
+) -> pd.DataFrame:
+    ptax = fetch_ptax(["USD"], start_date, end_date, store, quotation_days_only)
+    usd_ptax = ptax.droplevel("currency")
 
-    return ffill_ptax
+    return usd_ptax if quotation_days_only else usd_ptax.asfreq("D")
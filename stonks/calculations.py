@@ -1,16 +1,18 @@
+from collections.abc import Iterator
 from datetime import date
+from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
-from pandas import DataFrame, Series
+from pandas import DataFrame, Timestamp
 from pandera.pandas import check_input, check_output
 
-from .events import concat_events, event_fn, filter_by_date
-from .positions import Positions
+from .ptax import PTAXIndex
 from .schemas import (
     PTAX,
     Mergers,
     PositionsCalcResult,
+    PositionsHistoryCalcResult,
     Rights,
     RightsCalcResult,
     RightsPreCalc,
@@ -26,11 +28,19 @@ from .schemas import (
     USDividendsCalcResult,
     USDividendsPreCalc,
     USPositionsCalcResult,
+    USPositionsHistoryCalcResult,
     USTrades,
     USTradesCalcResult,
     USTradesPreCalc,
 )
-from .utils import previous_month_15th
+from .utils import previous_months_15th
+
+# the positions engine is imported only by the calculations of positions, so
+# handlers of other tables do not import it
+if TYPE_CHECKING:
+    from .checkpoints import Checkpoints
+    from .events import Engine
+    from .positions import Positions, USPositions
 
 
 # This function calculates some columns required for other calculations based on
@@ -107,6 +117,12 @@ def calc_rights_amounts(rights: DataFrame) -> DataFrame:
 
 # Calculate positions at a given date by processing all trades along with all
 # corporate actions.
+#
+# When `checkpoints` is given, positions are restored from the latest valid
+# snapshot and only the events after it are processed.
+#
+# When `workers` is given, symbols not linked by mergers or spin-offs are
+# processed in parallel by that many processes.
 @check_input(Trades, "trades")
 @check_input(Rights, "rights")
 @check_input(Splits, "splits")
@@ -122,7 +138,17 @@ def calc_positions(
     mergers: DataFrame,
     spin_offs: DataFrame,
     stock_dividends: DataFrame,
+    engine: "Engine" = "itertuples",
+    checkpoints: "Checkpoints | None" = None,
+    workers: int | None = None,
 ) -> DataFrame:
+    from .events import concat_events, filter_by_date, replay
+    from .parallel import replay_in_parallel
+    from .positions import Positions
+
+    if checkpoints is not None and workers is not None:
+        raise ValueError("checkpoints cannot be used with workers")
+
     events = concat_events(
         {
             "trade": trades,
@@ -134,15 +160,84 @@ def calc_positions(
         }
     )
     filtered_events = filter_by_date(events=events, date=date)
-    positions = Positions()
 
-    for _, event in filtered_events.iterrows():
-        fn = event_fn(event)
-        fn(positions, event)
+    if workers is not None:
+        positions_df = replay_in_parallel(filtered_events, engine, workers)
+    elif checkpoints is not None:
+        positions_df = checkpoints.replay(filtered_events, engine).to_df()
+    else:
+        positions = Positions()
+        replay(positions, filtered_events, engine)
+        positions_df = positions.to_df()
 
     # reset index to a sequential numeric index so it can be used to update
     # excel tables
-    return positions.to_df().reset_index()
+    return positions_df.reset_index()
+
+
+# The positions at each date, one row per symbol. `empty` gives the columns
+# when there are no dates, or no events.
+def _history_to_df(
+    history: Iterator[tuple[Timestamp, "Positions | USPositions"]],
+    empty: "Positions | USPositions",
+) -> DataFrame:
+    dfs = []
+
+    for day, positions in history:
+        df = positions.to_df().reset_index()
+        df.insert(0, "date", day)
+        dfs.append(df)
+
+    if not dfs:
+        df = empty.to_df().reset_index()
+        df.insert(0, "date", pd.Series(dtype="datetime64[ns]"))
+        return df
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+# Calculate positions at each one of the given dates, or at every date where
+# anything changed when `dates` is not given, by processing all trades along
+# with all corporate actions only once.
+@check_input(Trades, "trades")
+@check_input(Rights, "rights")
+@check_input(Splits, "splits")
+@check_input(Mergers, "mergers")
+@check_input(SpinOffs, "spin_offs")
+@check_input(StockDividends, "stock_dividends")
+@check_output(PositionsHistoryCalcResult)
+def calc_positions_history(
+    dates: list[date] | None,
+    trades: DataFrame,
+    rights: DataFrame,
+    splits: DataFrame,
+    mergers: DataFrame,
+    spin_offs: DataFrame,
+    stock_dividends: DataFrame,
+    engine: "Engine" = "itertuples",
+) -> DataFrame:
+    from .events import concat_events, replay
+    from .history import replay_history
+    from .positions import Positions
+
+    events = concat_events(
+        {
+            "trade": trades,
+            "right": rights,
+            "split": splits,
+            "merger": mergers,
+            "spin_off": spin_offs,
+            "stock_dividend": stock_dividends,
+        }
+    )
+    history = replay_history(
+        Positions(),
+        events,
+        lambda positions, events: replay(positions, events, engine),
+        dates,
+    )
+
+    return _history_to_df(history, empty=Positions())
 
 
 # Calculate PTAX, price and amount in BRL for US trades.
@@ -150,34 +245,27 @@ def calc_positions(
 @check_input(PTAX, "ptax")
 @check_output(USTradesCalcResult)
 def calc_us_trades(trades: DataFrame, ptax: DataFrame) -> DataFrame:
-    trades_with_ptax = trades.join(ptax.selling_rate, on=["date"])
+    ptax_rates = PTAXIndex(ptax).selling_rates(trades.index.get_level_values("date"))
+    selling_rate = pd.Series(ptax_rates, index=trades.index)
 
     # for some reason the price per share informed in the transactions page
     # is incorrect by a few pennies for DRIP transactions but the amount is correct
     # so we need to recalculate the correct price per share using amount / quantity
-    price_adjusted = trades_with_ptax.amount / trades_with_ptax.quantity
+    price_adjusted = trades.amount / trades.quantity
 
-    costs = trades_with_ptax.commission + trades_with_ptax.reg_fee
+    costs = trades.commission + trades.reg_fee
 
     # calculate the amount in BRL for tax purposes
-    price_brl = (trades_with_ptax.selling_rate * price_adjusted).round(2)
-    amount_brl = (trades_with_ptax.selling_rate * trades_with_ptax.amount).round(2)
+    price_brl = (selling_rate * price_adjusted).round(2)
+    amount_brl = (selling_rate * trades.amount).round(2)
 
     return pd.concat(
-        [costs, trades_with_ptax.selling_rate, price_brl, amount_brl],
+        [costs, selling_rate, price_brl, amount_brl],
         axis="columns",
         keys=["costs", "ptax", "price_brl", "amount_brl"],
     )
 
 
-def _map_brl_event(event: Series) -> Series:
-    # remove the _brl suffix from event so it can be used with all functions
-    # defined in events.py
-    return event.drop(["price", "amount"]).rename(
-        {"price_brl": "price", "amount_brl": "amount"}, errors="raise"
-    )
-
-
 # Calculate positions at a given date by processing all trades along with all
 # corporate actions.
 @check_input(USTrades, "trades")
@@ -185,28 +273,47 @@ def _map_brl_event(event: Series) -> Series:
 def calc_us_positions(
     date: date,
     trades: DataFrame,
+    engine: "Engine" = "itertuples",
 ) -> DataFrame:
+    from .events import US_EVENT_FNS, concat_events, filter_by_date, replay
+    from .positions import USPositions
+
     events = concat_events({"trade": trades})
     filtered_events = filter_by_date(events=events, date=date)
 
-    positions = Positions()
-    positions_brl = Positions()
-
     # calculate positions in the original currency (USD) and in BRL for tax
-    # purposes
-    for _, event in filtered_events.iterrows():
-        fn = event_fn(event)
-        fn(positions, event)
-        fn(positions_brl, _map_brl_event(event))
-
-    # remove duplicate quantity as it is the same in both dataframes
-    positions_brl_df = positions_brl.to_df().drop(columns="quantity")
-    # join BRL details with the positions dataframe
-    joined_positions = positions.to_df().join(positions_brl_df, on="symbol", rsuffix="_brl")
+    # purposes at once
+    positions = USPositions()
+    replay(positions, filtered_events, engine, US_EVENT_FNS)
 
     # reset index to a sequential numeric index so it can be used to update
     # excel tables
-    return joined_positions.reset_index()
+    return positions.to_df().reset_index()
+
+
+# Calculate US positions at each one of the given dates, or at every date
+# where anything changed when `dates` is not given, by processing all trades
+# only once.
+@check_input(USTrades, "trades")
+@check_output(USPositionsHistoryCalcResult)
+def calc_us_positions_history(
+    dates: list[date] | None,
+    trades: DataFrame,
+    engine: "Engine" = "itertuples",
+) -> DataFrame:
+    from .events import US_EVENT_FNS, concat_events, replay
+    from .history import replay_history
+    from .positions import USPositions
+
+    events = concat_events({"trade": trades})
+    history = replay_history(
+        USPositions(),
+        events,
+        lambda positions, events: replay(positions, events, engine, US_EVENT_FNS),
+        dates,
+    )
+
+    return _history_to_df(history, empty=USPositions())
 
 
 # Calculate PTAX, amount and taxes in BRL for US dividends.
@@ -217,20 +324,18 @@ def calc_us_dividends(dividends: DataFrame, ptax: DataFrame) -> DataFrame:
     # dividends in USD must be converted into BRL using the PTAX for the last
     # business day of the first fortnight of the month prior to the dividend
     #
-    # since PTAX missing dates are filled with ffill, we can use 15th of the
-    # month without having to calculate business days
-    ptax_dates = dividends.index.map(previous_month_15th)
-    dividends_w_ptax = dividends.assign(ptax_date=ptax_dates).join(
-        ptax.buying_rate, on=["ptax_date"]
-    )
+    # PTAXIndex looks up the last rate on or before each date, so we can use
+    # the 15th of the month without having to calculate business days
+    ptax_dates = previous_months_15th(dividends.index.to_numpy())
+    buying_rate = pd.Series(PTAXIndex(ptax).buying_rates(ptax_dates), index=dividends.index)
 
     total = dividends.amount - dividends.taxes
-    amount_brl = (dividends.amount * dividends_w_ptax.buying_rate).round(2)
-    taxes_brl = (dividends.taxes * dividends_w_ptax.buying_rate).round(2)
-    total_brl = (total * dividends_w_ptax.buying_rate).round(2)
+    amount_brl = (dividends.amount * buying_rate).round(2)
+    taxes_brl = (dividends.taxes * buying_rate).round(2)
+    total_brl = (total * buying_rate).round(2)
 
     return pd.concat(
-        [total, dividends_w_ptax.buying_rate, amount_brl, taxes_brl, total_brl],
+        [total, buying_rate, amount_brl, taxes_brl, total_brl],
         axis="columns",
         keys=["total", "ptax", "amount_brl", "taxes_brl", "total_brl"],
     )
@@ -0,0 +1,127 @@
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+from pandas import CategoricalDtype, DataFrame, Series, Timestamp
+
+from .events import Engine, replay
+from .positions import Positions
+
+
+# Snapshots of positions saved at the end of every period (month ends by
+# default) while events are replayed, so a later replay can resume from the
+# nearest snapshot instead of starting from the first trade.
+#
+# The events replayed last are kept along with the snapshots, and a snapshot is
+# valid for as long as all events before it are the same. If any of these
+# events change (edited, added or removed), the snapshot is dropped. The first
+# event that changed is found comparing each column at once, which is cheaper
+# than hashing all events again on every replay.
+class Checkpoints:
+    def __init__(self, freq: str = "ME") -> None:
+        self._freq = freq
+        self._events: dict[str, Series] = {}
+        # number of events up to each snapshot and the positions after them
+        self._snapshots: dict[Timestamp, tuple[int, Positions]] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    # Expects events sorted by date, as returned by `concat_events`.
+    def replay(self, events: DataFrame, engine: Engine = "itertuples") -> Positions:
+        positions = Positions()
+        columns = _columns(events)
+        unchanged = _common_prefix(self._events, columns)
+
+        self._events = columns
+        self._snapshots = {
+            checkpoint: snapshot
+            for checkpoint, snapshot in self._snapshots.items()
+            if snapshot[0] <= unchanged
+        }
+
+        if events.empty:
+            return positions
+
+        checkpoints = list(self._checkpoints(events))
+        start = 0
+
+        # resume from the latest snapshot that is still valid
+        for checkpoint, end in reversed(checkpoints):
+            if checkpoint in self._snapshots and self._snapshots[checkpoint][0] == end:
+                positions = self._snapshots[checkpoint][1].copy()
+                start = end
+                break
+
+        for checkpoint, end in checkpoints:
+            if end < start:
+                continue
+
+            replay(positions, events.iloc[start:end], engine)
+            self._snapshots[checkpoint] = (end, positions.copy())
+            start = end
+
+        replay(positions, events.iloc[start:], engine)
+
+        return positions
+
+    # Yields every checkpoint between the first and the last event along with
+    # the number of events up to it (inclusive).
+    def _checkpoints(self, events: DataFrame) -> Iterator[tuple[Timestamp, int]]:
+        dates = events.date.to_numpy()
+        checkpoints = pd.date_range(dates[0], dates[-1], freq=self._freq)
+        ends = np.searchsorted(dates, checkpoints.to_numpy(), side="right")
+
+        for checkpoint, end in zip(checkpoints, ends, strict=True):
+            yield checkpoint, int(end)
+
+
+# Columns of the events, compared between replays.
+def _columns(events: DataFrame) -> dict[str, Series]:
+    columns = {column: events[column] for column in events.columns}
+
+    # rights with a future issue date are skipped during replay, so snapshots
+    # that include them are no longer valid once they are issued
+    if "issue_date" in events:
+        columns["pending"] = events.issue_date > Timestamp.today()
+
+    return columns
+
+
+# Number of leading rows that are the same in both sets of columns.
+def _common_prefix(old: dict[str, Series], new: dict[str, Series]) -> int:
+    if list(old) != list(new):
+        return 0
+
+    size = min((min(len(old[c]), len(new[c])) for c in new), default=0)
+
+    for column in new:
+        changed = _changed(old[column].iloc[:size], new[column].iloc[:size])
+
+        if len(changed) > 0:
+            size = int(changed[0])
+
+    return size
+
+
+# Positions of the values that are different, missing values are the same even
+# though NaN is not equal to itself.
+def _changed(old: Series, new: Series) -> np.ndarray:
+    if isinstance(old.dtype, CategoricalDtype) and isinstance(new.dtype, CategoricalDtype):
+        # categories change when values are added (e.g. a new symbol), so old
+        # codes are translated into new ones; categories no longer in use get
+        # -2, which no value has, and missing values keep -1
+        codes = new.cat.categories.get_indexer(old.cat.categories)
+        codes = np.append(np.where(codes == -1, -2, codes), -1)
+        return np.flatnonzero(codes[old.cat.codes.to_numpy()] != new.cat.codes.to_numpy())
+
+    if old.dtype != new.dtype:
+        return np.arange(len(new))
+
+    a, b = old.to_numpy(), new.to_numpy()
+    changed = a != b
+
+    if changed.any():
+        changed &= ~(pd.isna(a) & pd.isna(b))
+
+    return np.flatnonzero(changed)
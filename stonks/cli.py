@@ -0,0 +1,114 @@
+import argparse
+import os
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .files import FileWorkbook, Format
+from .graph import downstream, propagate
+from .updates import UPDATES
+
+# every table comes after the tables it reads
+STAGES = downstream(UPDATES)
+
+# seconds taken by each stage, None when it was skipped
+type Timings = dict[str, float | None]
+
+
+# Runs every stage on the workbook kept in `path`, stages in independent
+# branches in up to `threads` threads. Stages are skipped when the tables or
+# date inputs they require are missing, so a portfolio without US trades has
+# only the stages it needs. Missing optional tables are read as empty.
+#
+# Stages that read the results of a failing one are not run, as they would read
+# stale results. Returns the timings, in the order of STAGES, and the errors.
+def run_portfolio(
+    path: Path, format: Format = "csv", threads: int = 1
+) -> tuple[Timings, list[str]]:
+    wb = FileWorkbook(path, format)
+    timings: Timings = {}
+
+    def run(stage: str) -> None:
+        update = UPDATES[stage]
+        tables = [
+            *(name for name in update.inputs if name not in update.optional),
+            *([] if update.replaces else [stage]),
+        ]
+        dates = wb.inputs.get(stage, {})
+
+        if not all(map(wb.has_table, tables)) or not all(name in dates for name in update.dates):
+            timings[stage] = None
+            return
+
+        start = time.perf_counter()
+        update.run(wb)
+        timings[stage] = time.perf_counter() - start
+
+    errors, _ = propagate(STAGES, run, workers=threads)
+
+    return (
+        {stage: timings[stage] for stage in STAGES if stage in timings},
+        [f"{stage}: {error}" for stage, error in errors.items()],
+    )
+
+
+def _print_timings(results: dict[Path, tuple[Timings, list[str]]], elapsed: float) -> None:
+    width = max(len("portfolio"), *(len(str(path)) for path in results))
+
+    print(f"{'portfolio':<{width}} {'stage':<20} {'seconds':>8}")
+
+    for path, (timings, errors) in results.items():
+        for stage, seconds in timings.items():
+            shown = "skipped" if seconds is None else f"{seconds:.3f}"
+            print(f"{str(path):<{width}} {stage:<20} {shown:>8}")
+
+        for error in errors:
+            print(f"{str(path):<{width}} error: {error}")
+
+    print()
+    print(f"{'stage':<20} {'seconds':>8}")
+
+    for stage in STAGES:
+        total = sum(timings.get(stage) or 0 for timings, _ in results.values())
+        print(f"{stage:<20} {total:>8.3f}")
+
+    print(f"{'wall time':<20} {elapsed:>8.3f}")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m stonks",
+        description="Recalculates every table of portfolios kept in directories of files.",
+    )
+    parser.add_argument("portfolios", type=Path, nargs="+", help="directories with the tables")
+    parser.add_argument("--format", choices=["csv", "parquet", "xlsx"], default="csv")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="portfolios run in parallel"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=4,
+        help="independent stages of each portfolio run in parallel",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    if args.workers == 1 or len(args.portfolios) == 1:
+        results = [run_portfolio(path, args.format, args.threads) for path in args.portfolios]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(
+                executor.map(
+                    run_portfolio,
+                    args.portfolios,
+                    [args.format] * len(args.portfolios),
+                    [args.threads] * len(args.portfolios),
+                )
+            )
+
+    _print_timings(dict(zip(args.portfolios, results, strict=True)), time.perf_counter() - start)
+
+    return 1 if any(errors for _, errors in results) else 0
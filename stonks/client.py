@@ -0,0 +1,87 @@
+import http.client
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from .errors import HTTPRequestError
+
+# statuses worth retrying, the request may succeed later
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# Minimal HTTP client for GET requests that keeps connections open between
+# requests, so several requests to the same host pay for a single TCP and TLS
+# handshake. Connections are pooled, so the client can be shared by threads.
+#
+# Requests are retried on connection errors and on the statuses above, up to
+# `retries` times, waiting `backoff` seconds before the first retry and twice
+# as long before each retry after it.
+class HTTPClient:
+    def __init__(self, timeout: float = 30, retries: int = 3, backoff: float = 0.5):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self, scheme: str, netloc: str) -> Iterator[http.client.HTTPConnection]:
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            conn = idle.pop() if idle else None
+
+        if conn is None:
+            # looked up on every call instead of imported, so the classes can be
+            # patched, e.g. to record and replay requests in tests
+            conn_class = (
+                http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            )
+            conn = conn_class(netloc, timeout=self.timeout)
+
+        try:
+            yield conn
+        except BaseException:
+            # the state of the connection is unknown, do not reuse it
+            conn.close()
+            raise
+
+        with self._lock:
+            idle.append(conn)
+
+    def _request(self, url: str) -> tuple[int, bytes]:
+        parts = urlsplit(url)
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+        with self._connection(parts.scheme, parts.netloc) as conn:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            # the whole body must be read before the connection is reused
+            return response.status, response.read()
+
+    def get(self, url: str) -> bytes:
+        attempt = 0
+
+        while True:
+            try:
+                status, body = self._request(url)
+            except (OSError, http.client.HTTPException):
+                if attempt == self.retries:
+                    raise
+            else:
+                if status == 200:
+                    return body
+                if status not in _RETRY_STATUSES or attempt == self.retries:
+                    raise HTTPRequestError(url, status)
+
+            time.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    def close(self) -> None:
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+
+            self._idle.clear()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import secrets
+from collections.abc import Callable
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any
+
+import xlwings as xw  # type: ignore
+
+from . import xlwings as handlers
+from .remote import DAEMON_PATH
+
+
+# Long-lived process that runs the handlers of stonks.xlwings on behalf of
+# thin clients (see stonks.remote), so Excel events do not pay for starting
+# Python and importing pandas, pandera and the calculations. Caches, like
+# positions checkpoints and PTAX prefetching, stay warm between events.
+#
+# Only local clients with the key written to `path`, along with the port, are
+# served. Requests are served one at a time, like Excel runs its events.
+class Daemon:
+    def __init__(
+        self,
+        path: Path = DAEMON_PATH,
+        port: int = 0,
+        open_book: Callable[[str], Any] = xw.Book,
+    ):
+        self.path = path
+        self._open_book = open_book
+        self._authkey = secrets.token_bytes(32)
+        self._listener = Listener(("127.0.0.1", port), authkey=self._authkey)
+        self.port = int(self._listener.address[1])
+        self._closed = False
+
+    def serve_forever(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # only readable by the user running the daemon
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+        with os.fdopen(fd, "w") as file:
+            json.dump({"port": self.port, "authkey": self._authkey.hex()}, file)
+
+        try:
+            while not self._closed:
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    # clients without the key are dropped
+                    continue
+
+                with conn:
+                    try:
+                        handler, book = conn.recv()
+                        conn.send(self._run(handler, book))
+                    except (OSError, EOFError):
+                        # the client went away
+                        continue
+        finally:
+            self.path.unlink(missing_ok=True)
+            self._listener.close()
+
+    # Returns the error, if any. Errors of calculations are shown by handlers
+    # in the message box, so these are only errors that handlers do not catch.
+    def _run(self, handler: str, book: str) -> str | None:
+        if not handler.startswith("on_") or not hasattr(handlers, handler):
+            return f"unknown handler: {handler}"
+
+        try:
+            getattr(handlers, handler)(self._open_book(book))
+        except Exception as e:
+            return f"{e}"
+
+        return None
+
+    # Stops `serve_forever`, which may be waiting for a client in another
+    # thread, by connecting to it.
+    def close(self) -> None:
+        self._closed = True
+
+        try:
+            Client(("127.0.0.1", self.port), authkey=self._authkey).close()
+        except OSError:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m stonks.daemon",
+        description="Runs the workbook handlers for clients started by Excel.",
+    )
+    parser.add_argument("--port", type=int, default=0, help="any free port by default")
+    args = parser.parse_args()
+
+    daemon = Daemon(port=args.port)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
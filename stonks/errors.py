@@ -6,3 +6,16 @@ class PositionNotOpenError(Exception):
 class UnknownEventError(Exception):
     def __init__(self, event: str):
         super().__init__(f"unknown event type: {event}")
+
+
+class InvalidRatioError(Exception):
+    def __init__(self, table: str, positions: list[int], ratios: list[str]):
+        invalid = ", ".join(f"{ratio!r} (row {pos})" for pos, ratio in zip(positions, ratios))
+        super().__init__(
+            f"invalid ratios in {table}: {invalid}, expected A:B with positive numbers (e.g. 1:2)"
+        )
+
+
+class HTTPRequestError(Exception):
+    def __init__(self, url: str, status: int):
+        super().__init__(f"request failed with status {status}: {url}")
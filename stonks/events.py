@@ -1,40 +1,110 @@
 import math
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Sequence
 from datetime import date
+from typing import Any, Literal
 
+import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
 from pandas import DataFrame, Series
 
 from .errors import PositionNotOpenError, UnknownEventError
-from .positions import Positions
-from .utils import ratio_to_float
+from .positions import Positions, USPositions
+from .utils import ratios_to_float
 
+# Events are either rows returned by `DataFrame.iterrows` (pandas Series) or
+# named tuples returned by `DataFrame.itertuples`. Both expose event columns as
+# attributes, which is all the functions below rely on.
+type Event = Any
+type EventFn = Callable[[Positions, Event], None]
+type USEventFn = Callable[[USPositions, Event], None]
 
+_CATEGORICAL_COLUMNS = ["event", "type", "symbol"]
+
+# Engines used to replay events:
+#
+# - iterrows: builds a Series for every event. Slow, kept as a reference.
+# - itertuples: reads events as plain named tuples built from column arrays.
+type Engine = Literal["iterrows", "itertuples"]
+
+
+# tables of events with ratios, named in errors about them
+_RATIO_TABLES = {"split": "Splits", "merger": "Mergers", "spin_off": "SpinOffs"}
+
+
+# Combines tables of events, keyed by event type, sorted by date. Ratios of
+# corporate actions are validated and parsed here, as the tables are read.
 def concat_events(dfs: dict[str, DataFrame]) -> DataFrame:
-    events = [df.reset_index().assign(event=event) for event, df in dfs.items()]
+    events = []
+
+    for event, df in dfs.items():
+        events.append(df.reset_index())
+        # set the event column in place, `reset_index` already returns a copy
+        events[-1]["event"] = event
+
+        # parse corporate action ratios once, instead of for every event
+        # during replays, so invalid ratios are reported before any replay
+        if "ratio" in df:
+            table = _RATIO_TABLES.get(event, event)
+            events[-1]["ratio_value"] = ratios_to_float(events[-1].ratio, table)
 
     # `ignore_index` will create a new sequential index, which will work as ID for the `sort_values` below. For events
     # with the same date, the ID will be used to differentiate between then and ensure the order of appearance is
     # respected.
     combined_dfs = pd.concat(events, ignore_index=True).rename_axis("id")
-    sorted_dfs = combined_dfs.sort_values(by=["date", "id"], ignore_index=True)
+
+    if all(df.date.is_monotonic_increasing for df in events):
+        # tables are usually sorted by date already, so the combined dates are
+        # k sorted runs that a stable sort (timsort) merges in O(n log k),
+        # keeping the ID order for events with the same date
+        order = np.argsort(combined_dfs.date.to_numpy(), kind="stable")
+        # skip copying all columns when tables do not overlap in time
+        in_order = bool((order[1:] > order[:-1]).all())
+        sorted_dfs = (combined_dfs if in_order else combined_dfs.take(order)).reset_index(drop=True)
+    else:
+        sorted_dfs = combined_dfs.sort_values(by=["date", "id"], ignore_index=True)
+
+    # repeated strings are stored as categories, which are compared as integers
+    for column in _CATEGORICAL_COLUMNS:
+        if column in sorted_dfs:
+            sorted_dfs[column] = sorted_dfs[column].astype("category")
+
+    sorted_dfs["code"] = event_codes(sorted_dfs)
 
     return sorted_dfs
 
 
+# Expects events sorted by date, as returned by `concat_events`.
 def filter_by_date(events: DataFrame, date: date) -> DataFrame:
-    query = (events.event != "right") & (events.date <= str(date))
+    day = pd.Timestamp(date)
+    # events up to the given date are a prefix of the sorted events
+    end = events.date.searchsorted(day, side="right")
+
+    if "issue_date" not in events:
+        return events.iloc[:end]
+
+    # filter out events that should be computed in the future, rights are
+    # computed from their issue date instead of their date
+    query = np.arange(len(events)) < end
+    rights = (events.event == "right").to_numpy()
+    query[rights] = events.issue_date.to_numpy()[rights] <= day.to_datetime64()
 
-    # filter out events that should be computed in the future
-    if "issue_date" in events:
-        query = (events.event == "right") & (events.issue_date <= str(date)) | query
+    if query[:end].all() and not query[end:].any():
+        return events.iloc[:end]
 
-    res: DataFrame = events[query]
+    return events[query]
 
-    return res
 
+# Date from which an event affects positions. Rights are only computed once
+# issued, every other event from its own date.
+def effective_dates(events: DataFrame) -> Series:
+    if "issue_date" not in events:
+        return events.date
 
-def buy(positions: Positions, event: Series) -> None:
+    return events.date.where(events.event != "right", events.issue_date)
+
+
+def buy(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # first buy, not yet in positions dataframe
         new_quantity = event.quantity
@@ -53,7 +123,7 @@ def buy(positions: Positions, event: Series) -> None:
     )
 
 
-def sell(positions: Positions, event: Series) -> None:
+def sell(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # safeguard against incorrect data
         raise PositionNotOpenError(event.symbol)
@@ -76,7 +146,7 @@ def sell(positions: Positions, event: Series) -> None:
         )
 
 
-def right(positions: Positions, event: Series) -> None:
+def right(positions: Positions, event: Event) -> None:
     # rights not yet issued must not change current positions
     if pd.isnull(event.issue_date) or event.issue_date.date() > date.today():
         return
@@ -99,13 +169,13 @@ def right(positions: Positions, event: Series) -> None:
     )
 
 
-def merger(positions: Positions, event: Series) -> None:
+def merger(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # safeguard against incorrect data
         raise PositionNotOpenError(event.symbol)
 
     position_to_merge = positions.find(event.symbol)
-    ratio = ratio_to_float(event.ratio)
+    ratio = event.ratio_value
 
     # quantity should be truncated because fractional shares are not allowed on B3
     quantity = math.trunc(position_to_merge.quantity / ratio)
@@ -118,13 +188,13 @@ def merger(positions: Positions, event: Series) -> None:
     positions.update(event.acquirer, quantity=quantity, cost=cost, cost_per_share=cost_per_share)
 
 
-def split(positions: Positions, event: Series) -> None:
+def split(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # safeguard against incorrect data
         raise PositionNotOpenError(event.symbol)
 
     position_to_split = positions.find(event.symbol)
-    ratio = ratio_to_float(event.ratio)
+    ratio = event.ratio_value
 
     # splits only affect quantity and cost per share
     # total cost does not change
@@ -139,13 +209,13 @@ def split(positions: Positions, event: Series) -> None:
     )
 
 
-def spin_off(positions: Positions, event: Series) -> None:
+def spin_off(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # safeguard against incorrect data
         raise PositionNotOpenError(event.symbol)
 
     position_to_spin_off = positions.find(event.symbol)
-    ratio = ratio_to_float(event.ratio)
+    ratio = event.ratio_value
 
     newco_quantity = math.trunc(position_to_spin_off.quantity / ratio)
     newco_cost = position_to_spin_off.cost * event.cost_basis
@@ -166,7 +236,7 @@ def spin_off(positions: Positions, event: Series) -> None:
     )
 
 
-def stock_dividend(positions: Positions, event: Series) -> None:
+def stock_dividend(positions: Positions, event: Event) -> None:
     if positions.is_closed(event.symbol):
         # safeguard against incorrect data
         raise PositionNotOpenError(event.symbol)
@@ -182,21 +252,119 @@ def stock_dividend(positions: Positions, event: Series) -> None:
     )
 
 
-def event_fn(e: Series) -> Callable[[Positions, Series], None]:
-    match e:
-        case Series(event="trade", type="buy"):
-            return buy
-        case Series(event="trade", type="sell"):
-            return sell
-        case Series(event="right"):
-            return right
-        case Series(event="merger"):
-            return merger
-        case Series(event="split"):
-            return split
-        case Series(event="spin_off"):
-            return spin_off
-        case Series(event="stock_dividend"):
-            return stock_dividend
+def us_buy(positions: USPositions, event: Event) -> None:
+    if positions.is_closed(event.symbol):
+        # first buy, not yet in positions dataframe
+        new_quantity = event.quantity
+        new_cost = event.amount
+        new_cost_brl = event.amount_brl
+    else:
+        # bought it before, let's sum quantity and update cost per share
+        prev = positions.find(event.symbol)
+
+        new_quantity = prev.quantity + event.quantity
+        new_cost = prev.cost + event.amount
+        new_cost_brl = prev.cost_brl + event.amount_brl
+
+    positions.update(
+        event.symbol,
+        quantity=new_quantity,
+        cost=new_cost,
+        cost_per_share=new_cost / new_quantity,
+        cost_brl=new_cost_brl,
+        cost_per_share_brl=new_cost_brl / new_quantity,
+    )
+
+
+def us_sell(positions: USPositions, event: Event) -> None:
+    if positions.is_closed(event.symbol):
+        # safeguard against incorrect data
+        raise PositionNotOpenError(event.symbol)
+
+    prev = positions.find(event.symbol)
+    # sells affect quantity and total costs
+    new_quantity = prev.quantity - event.quantity
+
+    if new_quantity == 0:
+        # sold all stocks, closing position
+        positions.close(event.symbol)
+    else:
+        positions.update(
+            event.symbol,
+            quantity=new_quantity,
+            cost=new_quantity * prev.cost_per_share,
+            # sells do not affect cost per share
+            cost_per_share=prev.cost_per_share,
+            cost_brl=new_quantity * prev.cost_per_share_brl,
+            cost_per_share_brl=prev.cost_per_share_brl,
+        )
+
+
+# Kinds of events along with the function that must be applied to them. The
+# position of each kind is its dispatch code (see `event_codes`). A type of
+# None matches events of any type.
+_EVENT_KINDS: tuple[tuple[str, str | None, EventFn], ...] = (
+    ("trade", "buy", buy),
+    ("trade", "sell", sell),
+    ("right", None, right),
+    ("merger", None, merger),
+    ("split", None, split),
+    ("spin_off", None, spin_off),
+    ("stock_dividend", None, stock_dividend),
+)
+
+EVENT_FNS: tuple[EventFn, ...] = tuple(fn for _, _, fn in _EVENT_KINDS)
+
+# US positions are only affected by trades, which take the first two codes.
+US_EVENT_FNS: tuple[USEventFn, ...] = (us_buy, us_sell)
+
+
+# Computes the dispatch code of every event at once, so events can be replayed
+# by indexing `EVENT_FNS` instead of matching each one of them.
+def event_codes(events: DataFrame) -> NDArray[np.int8]:
+    codes = np.full(len(events), -1, dtype=np.int8)
+
+    for code, (kind, kind_type, _) in enumerate(_EVENT_KINDS):
+        matches = events.event == kind
+
+        if kind_type is not None:
+            matches &= events.type == kind_type if "type" in events else False
+
+        codes[(codes == -1) & matches.to_numpy()] = code
+
+    unknown = codes == -1
+
+    if unknown.any():
+        raise UnknownEventError(events.event[unknown].iloc[0])
+
+    return codes
+
+
+# Yields each event along with the function from `fns` that must be applied
+# to it.
+def iter_events(
+    events: DataFrame,
+    engine: Engine = "itertuples",
+    fns: Sequence[Callable[[Any, Event], None]] = EVENT_FNS,
+) -> Iterator[tuple[Callable[[Any, Event], None], Event]]:
+    codes = events.code if "code" in events else event_codes(events)
+
+    match engine:
+        case "iterrows":
+            for code, (_, row) in zip(codes, events.iterrows()):
+                yield fns[code], row
+        case "itertuples":
+            for code, event in zip(codes, events.itertuples(index=False, name="Event")):
+                yield fns[code], event
         case _:
-            raise UnknownEventError(e.event)
+            raise ValueError(f"unknown engine: {engine}")
+
+
+def replay(
+    positions: Any,
+    events: DataFrame,
+    engine: Engine = "itertuples",
+    fns: Sequence[Callable[[Any, Event], None]] = EVENT_FNS,
+) -> None:
+    for fn, event in iter_events(events, engine, fns):
+        fn(positions, event)
@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from functools import cached_property
+from typing import Any
 
 import xlwings as xw  # type: ignore
 from pandas import DataFrame
@@ -7,9 +8,12 @@ from pandas import DataFrame
 from stonks.mapping import SHEET_NAMES, TABLE_COLUMNS, TABLE_INDEXES, TABLE_VALUES
 
 from .utils import reverse_dict
+from .workbook import BaseWorkbook
 
 
-class Workbook:
+# Workbook open in Excel. Each table is read with two calls to Excel, one for
+# the headers and one for the data.
+class Workbook(BaseWorkbook):
     def __init__(self, wb: xw.Book):
         self._wb = wb
 
@@ -22,54 +26,6 @@ class Workbook:
 
         return Table(self._wb, sheet, table, index, table_col_map, table_values_map)
 
-    @cached_property
-    def positions(self) -> "Table":
-        return self._table("positions")
-
-    @cached_property
-    def trade_confirmations(self) -> "Table":
-        return self._table("trade_confirmations")
-
-    @cached_property
-    def trades(self) -> "Table":
-        return self._table("trades")
-
-    @cached_property
-    def rights(self) -> "Table":
-        return self._table("rights")
-
-    @cached_property
-    def splits(self) -> "Table":
-        return self._table("splits")
-
-    @cached_property
-    def mergers(self) -> "Table":
-        return self._table("mergers")
-
-    @cached_property
-    def spin_offs(self) -> "Table":
-        return self._table("spin_offs")
-
-    @cached_property
-    def stock_dividends(self) -> "Table":
-        return self._table("stock_dividends")
-
-    @cached_property
-    def ptax(self) -> "Table":
-        return self._table("ptax")
-
-    @cached_property
-    def us_trades(self) -> "Table":
-        return self._table("us_trades")
-
-    @cached_property
-    def us_positions(self) -> "Table":
-        return self._table("us_positions")
-
-    @cached_property
-    def us_dividends(self) -> "Table":
-        return self._table("us_dividends")
-
 
 class Table:
     def __init__(
@@ -98,11 +54,31 @@ class Table:
         value: datetime = self._cell(name).value
         return value.date()
 
-    def to_df(self) -> DataFrame:
-        headers = self._table.header_row_range.options(ndim=1).value
+    # Headers and data are read with a call to Excel each, and kept until the
+    # table is written. The whole range of the table is not read because it
+    # includes the totals row, when shown.
+    @cached_property
+    def _values(self) -> list[list[Any]]:
+        headers: list[Any] = self._table.header_row_range.options(ndim=1).value
+        body = self._table.data_body_range
+
+        if body is None:
+            return [headers]
+
         # ndim=2 to force .value to return 2-dimensional list when table
         # contains a single row
-        data = self._table.data_body_range.options(ndim=2).value
+        data: list[list[Any]] = body.options(ndim=2).value
+        return [headers, *data]
+
+    # Headers do not change while a handler runs, so they are read only once.
+    @cached_property
+    def _headers(self) -> list[str]:
+        headers: list[str] = self._values[0]
+        return headers
+
+    @cached_property
+    def _df(self) -> DataFrame:
+        headers, *data = self._values
 
         df = DataFrame(data, columns=headers).rename(
             columns=reverse_dict(self._col_map), errors="raise"
@@ -116,15 +92,31 @@ class Table:
 
         return df
 
+    # Forgets the data read from Excel, so the next read sees what was written.
+    def _invalidate(self) -> None:
+        self.__dict__.pop("_values", None)
+        self.__dict__.pop("_df", None)
+
+    # Returns a copy, callers are free to change it.
+    def to_df(self) -> DataFrame:
+        return self._df.copy()
+
     def update_from_df(self, df: DataFrame) -> None:
         renamed_df = df.rename(columns=self._col_map)
 
+        positions = sorted(self._headers.index(column) for column in renamed_df.columns)
+        body = self._table.data_body_range
+
         with self._wb.app.properties(enable_events=False, screen_updating=False):
             # update only the columns included in the dataframe to avoid changing
-            # any other data
-            for column_name in renamed_df.columns:
-                range = self._sheet.range(f"{self._table.name}[{column_name}]")
-                range.options(index=False, header=False).value = renamed_df[column_name]
+            # any other data, adjacent columns are written at once as a single
+            # block so each block costs a single call to Excel
+            for first, last in _runs(positions):
+                columns = self._headers[first : last + 1]
+                block = body[:, first : last + 1]
+                block.options(index=False, header=False).value = renamed_df[columns]
+
+        self._invalidate()
 
     def replace_with_df(self, df: DataFrame, index: bool = False) -> None:
         renamed_df = df.rename(columns=self._col_map)
@@ -132,5 +124,47 @@ class Table:
         if index:
             renamed_df.rename_axis(index=self._col_map, inplace=True)
 
+        values_df = renamed_df.reset_index() if index else renamed_df
+        rows = self._changed_rows(values_df)
+
         with self._wb.app.properties(enable_events=False, screen_updating=False):
-            self._table.update(renamed_df, index=index)
+            if rows is None:
+                self._table.update(renamed_df, index=index)
+            else:
+                # only rows that changed are written, adjacent rows at once as
+                # a single block, so formulas depending on the other rows are
+                # not recalculated
+                body = self._table.data_body_range
+
+                for first, last in _runs(rows):
+                    block = body[first : last + 1, :]
+                    block.options(index=False, header=False).value = values_df[first : last + 1]
+
+        self._invalidate()
+
+    # Positions of the rows with values different from the ones in the table,
+    # or None when the table has to be resized or has different headers.
+    def _changed_rows(self, df: DataFrame) -> list[int] | None:
+        headers, *rows = self._values
+
+        if list(df.columns) != headers or len(df) != len(rows):
+            return None
+
+        # as returned by Excel, where empty cells are None
+        new_rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+
+        return [i for i, (old, new) in enumerate(zip(rows, new_rows, strict=True)) if old != new]
+
+
+# Groups sorted positions into runs of consecutive positions, returning the
+# first and last position of each run.
+def _runs(positions: list[int]) -> list[tuple[int, int]]:
+    runs: list[tuple[int, int]] = []
+
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1] = (runs[-1][0], position)
+        else:
+            runs.append((position, position))
+
+    return runs
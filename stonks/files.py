@@ -0,0 +1,153 @@
+import json
+import threading
+from datetime import date
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Literal
+
+import pandas as pd
+from pandas import DataFrame
+
+from .mapping import SHEET_NAMES, TABLE_COLUMNS
+from .workbook import BaseWorkbook, from_sheet, to_sheet
+
+type Format = Literal["csv", "parquet", "xlsx"]
+
+# columns of any table with these names hold dates
+_DATE_COLUMNS = {"date", "start", "end", "settlement", "issue_date"}
+# and these hold text, every other column holds numbers
+_STRING_COLUMNS = {"broker", "symbol", "type", "description", "acquirer", "new_company", "ratio"}
+
+
+# Workbook kept in files, so calculations can run without Excel.
+#
+# Tables are laid out as in the workbook, with the same headers and values
+# (see stonks.mapping). Each table is either a file named after it in `path`
+# (e.g. trades.csv or trades.parquet) or a sheet of `path`/workbook.xlsx.
+# Date inputs of the tables are read from `path`/inputs.json, e.g.:
+#
+#   {"positions": {"date": "2023-12-31"}, "ptax": {"start_date": "2023-01-01", ...}}
+#
+# Parquet and xlsx files require pyarrow and openpyxl respectively.
+#
+# Tables can be read and written from many threads, as long as each table is
+# written by one thread at a time.
+class FileWorkbook(BaseWorkbook):
+    def __init__(self, path: Path | str, format: Format = "csv"):
+        self.path = Path(path)
+        self.format = format
+        # what would be shown in the message box of each table
+        self.messages: dict[str, str] = {}
+        # tables of xlsx workbooks share a file, which is rewritten whole
+        self._xlsx_lock = threading.Lock()
+
+    def _table(self, name: str) -> "FileTable":
+        return FileTable(self, name)
+
+    @cached_property
+    def inputs(self) -> dict[str, dict[str, str]]:
+        path = self.path / "inputs.json"
+
+        if not path.exists():
+            return {}
+
+        inputs: dict[str, dict[str, str]] = json.loads(path.read_text())
+        return inputs
+
+    def _file(self, name: str) -> Path:
+        if self.format == "xlsx":
+            return self.path / "workbook.xlsx"
+
+        return self.path / f"{name}.{self.format}"
+
+    def has_table(self, name: str) -> bool:
+        path = self._file(name)
+
+        if self.format == "xlsx":
+            with self._xlsx_lock:
+                if not path.exists():
+                    return False
+
+                with pd.ExcelFile(path) as xls:
+                    return SHEET_NAMES[name] in xls.sheet_names
+
+        return path.exists()
+
+    # Missing tables are read as empty, with only their headers.
+    def read(self, name: str) -> DataFrame:
+        path = self._file(name)
+
+        if not self.has_table(name):
+            df = DataFrame(columns=list(TABLE_COLUMNS[name].values()))
+        elif self.format == "csv":
+            df = pd.read_csv(path)
+        elif self.format == "parquet":
+            df = pd.read_parquet(path)
+        else:
+            with self._xlsx_lock:
+                df = pd.read_excel(path, sheet_name=SHEET_NAMES[name])
+
+        # as returned by Excel, where numbers are always floats, whatever was
+        # inferred from the values (e.g. integers, or objects for empty tables)
+        types: dict[str, Any] = {
+            header: "datetime64[ns]" if column in _DATE_COLUMNS else float
+            for column, header in TABLE_COLUMNS[name].items()
+            if header in df and column not in _STRING_COLUMNS
+        }
+
+        return df.astype(types)
+
+    def write(self, name: str, df: DataFrame) -> None:
+        path = self._file(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.format == "csv":
+            df.to_csv(path, index=False, date_format="%Y-%m-%d")
+        elif self.format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            with self._xlsx_lock:
+                # other sheets are kept
+                mode: Literal["a", "w"] = "a" if path.exists() else "w"
+
+                with pd.ExcelWriter(
+                    path, mode=mode, if_sheet_exists="replace" if mode == "a" else None
+                ) as writer:
+                    df.to_excel(writer, sheet_name=SHEET_NAMES[name], index=False)
+
+
+class FileTable:
+    def __init__(self, wb: FileWorkbook, name: str):
+        self._wb = wb
+        self._name = name
+
+    def set_message(self, message: str) -> None:
+        self._wb.messages[self._name] = message
+
+    def date_input_value(self, name: str) -> date:
+        return date.fromisoformat(self._wb.inputs[self._name][name])
+
+    # Kept until the table is written.
+    @cached_property
+    def _sheet(self) -> DataFrame:
+        return self._wb.read(self._name)
+
+    def _write(self, sheet: DataFrame) -> None:
+        self._wb.write(self._name, sheet)
+        self.__dict__.pop("_sheet", None)
+
+    # Returns a copy, callers are free to change it.
+    def to_df(self) -> DataFrame:
+        return from_sheet(self._name, self._sheet.copy())
+
+    # Like in Excel, rows are updated by position and other columns are kept.
+    def update_from_df(self, df: DataFrame) -> None:
+        sheet = self._sheet.copy()
+
+        for column, values in df.rename(columns=TABLE_COLUMNS[self._name]).items():
+            sheet[column] = values.to_numpy()
+
+        self._write(sheet)
+
+    def replace_with_df(self, df: DataFrame, index: bool = False) -> None:
+        self._write(to_sheet(self._name, df, index=index))
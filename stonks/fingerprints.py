@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+from .store import DATA_DIR
+
+
+# Digest of the tables and dates a calculation depends on. Any change to the
+# values, index or columns of the tables, or to the dates, changes the digest.
+def fingerprint(tables: dict[str, DataFrame], dates: dict[str, date]) -> str:
+    digest = hashlib.blake2b()
+
+    for name, df in sorted(tables.items()):
+        digest.update(json.dumps([name, *map(str, df.columns)]).encode())
+        digest.update(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+
+    for name, value in sorted(dates.items()):
+        digest.update(json.dumps([name, value.isoformat()]).encode())
+
+    return digest.hexdigest()
+
+
+# Fingerprints of the last successful calculation of each table, kept in a JSON
+# file so they outlive the interpreter (xlwings may start a new one for every
+# event).
+class Fingerprints:
+    def __init__(self, path: Path | str = DATA_DIR / "fingerprints.json"):
+        self.path = Path(path)
+
+    def _load(self) -> dict[str, str]:
+        try:
+            fingerprints: dict[str, str] = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+        return fingerprints
+
+    def get(self, table_name: str) -> str | None:
+        return self._load().get(table_name)
+
+    def save(self, table_name: str, fingerprint: str) -> None:
+        fingerprints = self._load()
+        fingerprints[table_name] = fingerprint
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # replaced at once, so a concurrent reader never sees a partial file
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(fingerprints, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.path)
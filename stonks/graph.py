@@ -0,0 +1,99 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from graphlib import TopologicalSorter
+
+from .updates import UPDATES
+
+# Dependency graph of the tables, built from the tables each update reads (see
+# Update.inputs): every table with an update depends on its inputs. Tables
+# without updates, like splits, are only sources.
+DEPENDENTS: dict[str, set[str]] = {
+    table: {update.table_name for update in UPDATES.values() if table in update.inputs}
+    for table in {name for update in UPDATES.values() for name in update.inputs}
+}
+
+
+# Tables with updates that read, directly or not, any of `tables`, and those of
+# `tables` that have updates themselves. Every table comes after the tables it
+# reads.
+def downstream(tables: Iterable[str]) -> list[str]:
+    affected: set[str] = set()
+    pending = list(tables)
+
+    while pending:
+        table = pending.pop()
+
+        if table in UPDATES and table not in affected:
+            affected.add(table)
+
+        pending.extend(DEPENDENTS.get(table, set()) - affected)
+
+    return list(TopologicalSorter(_graph(affected)).static_order())
+
+
+# Every table in `tables`, with the tables in `tables` it reads.
+def _graph(tables: set[str]) -> dict[str, list[str]]:
+    # in the order updates are declared, so the order of tables is stable
+    return {
+        table: [name for name in update.inputs if name in tables]
+        for table, update in UPDATES.items()
+        if table in tables
+    }
+
+
+def _call(run: Callable[[str], None], table: str) -> Future[None]:
+    future: Future[None] = Future()
+
+    try:
+        run(table)
+        future.set_result(None)
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
+
+
+# Calls `run` with each table of `downstream(changed)`, once and only after the
+# tables it reads are done, so every table is recalculated from up to date
+# inputs. Tables that read a table that failed, directly or not, are not run.
+#
+# With more than one worker, tables in independent branches (e.g. trades and
+# PTAX) run concurrently in threads. Otherwise they run in the calling thread,
+# like xlwings requires.
+#
+# Returns the errors raised by `run` and the tables that were not run, because
+# of these errors.
+def propagate(
+    changed: Iterable[str], run: Callable[[str], None], workers: int = 1
+) -> tuple[dict[str, BaseException], list[str]]:
+    tables = downstream(changed)
+    sorter = TopologicalSorter(_graph(set(tables)))
+    sorter.prepare()
+
+    errors: dict[str, BaseException] = {}
+    not_run: list[str] = []
+    running: dict[Future[None], str] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+        while sorter.is_active():
+            for table in sorter.get_ready():
+                if any(name in errors or name in not_run for name in UPDATES[table].inputs):
+                    not_run.append(table)
+                    sorter.done(table)
+                elif executor is None:
+                    running[_call(run, table)] = table
+                else:
+                    running[executor.submit(run, table)] = table
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                table = running.pop(future)
+
+                if (error := future.exception()) is not None:
+                    errors[table] = error
+
+                sorter.done(table)
+
+    return errors, not_run
@@ -0,0 +1,84 @@
+from collections.abc import Callable, Iterator, Sequence
+from datetime import date
+from typing import Protocol, Self
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+from pandas import DataFrame, Timestamp
+
+from .events import effective_dates
+
+
+class State(Protocol):
+    def copy(self) -> Self: ...
+
+
+# Replays events only once and yields the state right after all events that
+# are effective up to each date (see `effective_dates`), which is the same as
+# filtering and replaying events for every date, but in a single pass. When
+# `dates` is not given, it yields every date where anything changed.
+#
+# The yielded state is updated in place by the next iteration, so it must be
+# consumed before moving on.
+#
+# Rights are replayed in the order of their date but only once issued. When a
+# right is issued after events that follow it have already been replayed, the
+# replay resumes from a snapshot saved right before the right.
+def replay_history[S: State](
+    state: S,
+    events: DataFrame,
+    replay: Callable[[S, DataFrame], None],
+    dates: Sequence[date] | None = None,
+) -> Iterator[tuple[Timestamp, S]]:
+    initial = state.copy()
+    effective = effective_dates(events).to_numpy()
+    # events sorted by effective date, NaT is sorted last and is never reached
+    by_effective = np.argsort(effective, kind="stable")
+    sorted_effective = effective[by_effective]
+    # rows that may be included after the events that follow them
+    holes = np.flatnonzero(effective > events.date.to_numpy())
+    included = np.zeros(len(events), dtype=bool)
+    snapshots: list[tuple[int, S]] = []
+    cursor = -1  # last replayed row
+    added = 0
+
+    if dates is None:
+        days = [Timestamp(d) for d in pd.unique(sorted_effective[~np.isnat(sorted_effective)])]
+    else:
+        days = sorted(Timestamp(d) for d in dates)
+
+    def advance(rows: NDArray[np.intp]) -> None:
+        nonlocal cursor
+        start = 0
+
+        # save a snapshot before every row skipped for now
+        for hole in holes[(holes > cursor) & (holes < rows[-1]) & ~included[holes]]:
+            end = int(np.searchsorted(rows, hole))
+            replay(state, events.iloc[rows[start:end]])
+            snapshots.append((hole - 1, state.copy()))
+            start = end
+
+        replay(state, events.iloc[rows[start:]])
+        cursor = rows[-1]
+
+    for day in days:
+        end = int(np.searchsorted(sorted_effective, day.to_datetime64(), side="right"))
+        new_rows = np.sort(by_effective[added:end])
+        added = end
+
+        if len(new_rows) > 0:
+            included[new_rows] = True
+
+            if new_rows[0] > cursor:
+                advance(new_rows)
+            else:
+                # go back to the latest snapshot before the first new row
+                while snapshots and snapshots[-1][0] >= new_rows[0]:
+                    snapshots.pop()
+
+                cursor, saved = snapshots[-1] if snapshots else (-1, initial)
+                state = saved.copy()
+                advance(np.flatnonzero(included[cursor + 1 :]) + cursor + 1)
+
+        yield day, state
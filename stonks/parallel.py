@@ -0,0 +1,81 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from .events import Engine, replay
+from .positions import Positions
+
+# columns with symbols that link positions together: mergers move a position to
+# the acquirer and spin-offs open a position in the new company
+_LINK_COLUMNS = ["acquirer", "new_company"]
+
+
+# Groups events by connected components of linked symbols. Positions of
+# symbols in different groups never affect each other, so each group can be
+# replayed on its own. Returns the group of each event.
+def symbol_groups(events: DataFrame) -> NDArray[np.intp]:
+    link_columns = [column for column in _LINK_COLUMNS if column in events]
+    codes, symbols = pd.factorize(
+        pd.concat([events.symbol, *(events[column] for column in link_columns)], ignore_index=True)
+    )
+    codes = codes.reshape(1 + len(link_columns), len(events))
+    parents = np.arange(len(symbols))
+
+    def find(symbol: int) -> int:
+        while parents[symbol] != symbol:
+            parents[symbol] = parents[parents[symbol]]
+            symbol = parents[symbol]
+
+        return symbol
+
+    for links in codes[1:]:
+        linked = links >= 0  # -1 means there is no link
+
+        for symbol, link in zip(codes[0][linked], links[linked], strict=True):
+            parents[find(symbol)] = find(link)
+
+    roots = np.array([find(symbol) for symbol in range(len(symbols))], dtype=np.intp)
+
+    return np.asarray(roots[codes[0]], dtype=np.intp)
+
+
+# Splits groups into `workers` chunks with about the same number of events.
+def _chunks(groups: NDArray[np.intp], workers: int) -> NDArray[np.intp]:
+    labels, sizes = np.unique(groups, return_counts=True)
+    loads = [(0, worker) for worker in range(workers)]
+    chunk_of_label = np.zeros(labels.max() + 1, dtype=np.intp)
+
+    # assign the largest groups first, always to the least loaded chunk
+    for label, size in sorted(zip(labels, sizes, strict=True), key=lambda item: -item[1]):
+        load, worker = heapq.heappop(loads)
+        chunk_of_label[label] = worker
+        heapq.heappush(loads, (load + int(size), worker))
+
+    return chunk_of_label[groups]
+
+
+def _replay_chunk(events: DataFrame, engine: Engine) -> DataFrame:
+    positions = Positions()
+    replay(positions, events, engine)
+
+    return positions.to_df()
+
+
+# Replays groups of linked symbols in a pool of `workers` processes and merges
+# their positions back into a single dataframe sorted by symbol.
+def replay_in_parallel(events: DataFrame, engine: Engine, workers: int) -> DataFrame:
+    if events.empty:
+        return _replay_chunk(events, engine)
+
+    chunks = _chunks(symbol_groups(events), workers)
+    chunk_events = [events[chunks == chunk] for chunk in np.unique(chunks)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        dfs = list(pool.map(_replay_chunk, chunk_events, repeat(engine)))
+
+    return pd.concat(dfs).sort_index()
@@ -1,18 +1,38 @@
-from dataclasses import dataclass
+import copy
+from dataclasses import dataclass, fields
+from typing import Self
 
-from pandas import DataFrame
+from pandas import DataFrame, Index
 
 
-@dataclass
+# Positions are updated in place, so `find` returns a record that changes on
+# the next update of the same symbol.
+@dataclass(slots=True)
 class Position:
     quantity: float
     cost: float
     cost_per_share: float
 
 
-class Positions:
+# Position in the original currency (USD) and in BRL for tax purposes. Both
+# cost bases are updated together, quantity is the same for both.
+@dataclass(slots=True)
+class USPosition(Position):
+    cost_brl: float
+    cost_per_share_brl: float
+
+
+# Open positions by symbol, kept as records of type `P`. Subclasses only add
+# `update`, with the fields of their records as arguments. Existing records
+# are updated in place by calling their `__init__` again, which sets every
+# field without allocating a new record. It is spelled out in each subclass
+# because `update` is called for every event, and forwarding the arguments to
+# a shared method makes replays noticeably slower.
+class BasePositions[P: Position]:
+    record: type[P]
+
     def __init__(self) -> None:
-        self._positions: dict[str, Position] = {}
+        self._positions: dict[str, P] = {}
 
     def is_open(self, symbol: str) -> bool:
         return symbol in self._positions
@@ -20,27 +40,58 @@ class Positions:
     def is_closed(self, symbol: str) -> bool:
         return not self.is_open(symbol)
 
-    def find(self, symbol: str) -> Position:
+    def find(self, symbol: str) -> P:
         return self._positions[symbol]
 
-    def update(self, symbol: str, /, quantity: float, cost: float, cost_per_share: float) -> None:
-        self._positions[symbol] = Position(
-            quantity=quantity,
-            cost=cost,
-            cost_per_share=cost_per_share,
-        )
-
     def close(self, symbol: str) -> None:
         self._positions.pop(symbol)
 
+    def copy(self) -> Self:
+        positions = type(self)()
+        positions._positions = {symbol: copy.copy(p) for symbol, p in self._positions.items()}
+
+        return positions
+
     def to_df(self) -> DataFrame:
-        return (
-            DataFrame.from_dict(
-                self._positions,
-                orient="index",
-                columns=["quantity", "cost", "cost_per_share"],
-            )
-            .rename_axis("symbol")  # rename the index
-            .sort_index()  # sort by symbol
-            .round({"cost": 2, "cost_per_share": 2})  # round costs, keep quantity as is
-        )
+        symbols = sorted(self._positions)  # sort by symbol
+        positions = [self._positions[symbol] for symbol in symbols]
+        names = [field.name for field in fields(self.record)]
+
+        return DataFrame(
+            {name: [getattr(p, name) for p in positions] for name in names},
+            index=Index(symbols, name="symbol"),
+        ).round({name: 2 for name in names if name != "quantity"})  # round costs, keep quantity
+
+
+class Positions(BasePositions[Position]):
+    record = Position
+
+    def update(self, symbol: str, /, quantity: float, cost: float, cost_per_share: float) -> None:
+        position = self._positions.get(symbol)
+
+        if position is None:
+            self._positions[symbol] = Position(quantity, cost, cost_per_share)
+        else:
+            Position.__init__(position, quantity, cost, cost_per_share)
+
+
+class USPositions(BasePositions[USPosition]):
+    record = USPosition
+
+    def update(
+        self,
+        symbol: str,
+        /,
+        quantity: float,
+        cost: float,
+        cost_per_share: float,
+        cost_brl: float,
+        cost_per_share_brl: float,
+    ) -> None:
+        position = self._positions.get(symbol)
+        values = (quantity, cost, cost_per_share, cost_brl, cost_per_share_brl)
+
+        if position is None:
+            self._positions[symbol] = USPosition(*values)
+        else:
+            USPosition.__init__(position, *values)
@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+
+from .bcb import fetch_ptax
+from .store import PTAXStore
+
+
+# Warms a PTAX store up to today in a background thread, so fetches made later
+# by handlers are answered from the store instead of waiting for the BCB.
+#
+# Downloads are shared with concurrent fetches to the same store (see
+# `fetch_ptax`), so a handler running while a prefetch is in progress waits for
+# it instead of downloading the same dates again.
+class PTAXPrefetcher:
+    def __init__(self, store: PTAXStore, currencies: list[str] | None = None):
+        self.store = store
+        self.currencies = currencies or ["USD"]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ptax-prefetch")
+        self._stop = threading.Event()
+
+    def _prefetch(self, start_date: date) -> None:
+        fetch_ptax(self.currencies, start_date, date.today(), self.store, quotation_days_only=True)
+
+    # Downloads PTAX rates from the start date up to today into the store.
+    def prefetch(self, start_date: date) -> Future[None]:
+        return self._executor.submit(self._prefetch, start_date)
+
+    # Prefetches now and then every `interval`, until `stop` is called, so the
+    # store also gets the rates published while the workbook is open.
+    def schedule(self, start_date: date, interval: timedelta) -> None:
+        self.stop()
+        stop = self._stop = threading.Event()
+
+        def run() -> None:
+            while not stop.is_set():
+                # failures are not fatal, whatever is still missing is fetched
+                # by the next run or by the handlers themselves
+                self.prefetch(start_date).exception()
+                stop.wait(interval.total_seconds())
+
+        threading.Thread(target=run, name="ptax-prefetch-schedule", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
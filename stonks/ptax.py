@@ -0,0 +1,51 @@
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from pandas import DataFrame
+
+
+# Lookup table of PTAX rates for converting many transactions at once.
+#
+# Rates are kept in dense arrays where the position of each rate is the number
+# of days between its date and the first date of the table. Looking up the
+# rates of any number of dates is then a single integer indexing operation,
+# instead of a join. Dates out of the table get NaN.
+#
+# Dates missing from the table, like weekends and holidays when only quotation
+# days are kept, get the last rate before them (as-of lookup), which is the
+# same rate a forward filled table has.
+class PTAXIndex:
+    def __init__(self, ptax: DataFrame):
+        days = ptax.index.to_numpy().astype("datetime64[D]")
+        self._start = days.min() if len(days) > 0 else np.datetime64("1970-01-01", "D")
+        offsets = (days - self._start).astype(np.int64)
+        size = offsets.max() + 1 if len(offsets) > 0 else 0
+
+        # offset of the last date in the table up to each day
+        last_offsets = np.zeros(size, dtype=np.int64)
+        last_offsets[offsets] = offsets
+        last_offsets = np.maximum.accumulate(last_offsets)
+        # and its row in the table
+        rows = np.zeros(size, dtype=np.int64)
+        rows[offsets] = np.arange(len(offsets))
+
+        self._rates = {
+            column: ptax[column].to_numpy(dtype=np.float64)[rows[last_offsets]]
+            for column in ["buying_rate", "selling_rate"]
+        }
+
+    def _lookup(self, column: str, dates: ArrayLike) -> NDArray[np.float64]:
+        rates = self._rates[column]
+        offsets = (np.asarray(dates, dtype="datetime64[D]") - self._start).astype(np.int64)
+        # NaT becomes the smallest integer, so it is out of the table as well
+        found = (offsets >= 0) & (offsets < len(rates))
+
+        results = np.full(offsets.shape, np.nan)
+        results[found] = rates[offsets[found]]
+
+        return results
+
+    def buying_rates(self, dates: ArrayLike) -> NDArray[np.float64]:
+        return self._lookup("buying_rate", dates)
+
+    def selling_rates(self, dates: ArrayLike) -> NDArray[np.float64]:
+        return self._lookup("selling_rate", dates)
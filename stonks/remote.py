@@ -0,0 +1,46 @@
+import json
+from multiprocessing.connection import Client, Connection
+from pathlib import Path
+
+# Thin client of the daemon (see stonks.daemon). Only the standard library is
+# imported here, so the process started by each Excel event skips importing
+# pandas, pandera and the calculations when the daemon is running.
+#
+# Call it from VBA with the full name of the workbook, e.g.:
+#
+#   RunPython "import stonks.remote; stonks.remote.call('on_trades_update', '" & _
+#       ThisWorkbook.FullName & "')"
+
+# written by the daemon with its port and key, like other local data
+DAEMON_PATH = Path(__file__).parent.parent / "data" / "daemon.json"
+
+
+def _connect() -> Connection | None:
+    try:
+        daemon = json.loads(DAEMON_PATH.read_text())
+        return Client(("127.0.0.1", daemon["port"]), authkey=bytes.fromhex(daemon["authkey"]))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Runs a handler of stonks.xlwings on the workbook `book`. When the daemon is
+# not running, the handler runs in this process on the workbook calling it.
+def call(handler: str, book: str) -> None:
+    conn = _connect()
+
+    if conn is None:
+        import stonks.xlwings
+
+        getattr(stonks.xlwings, handler)()
+        return
+
+    with conn:
+        try:
+            conn.send((handler, book))
+            error: str | None = conn.recv()
+        except (EOFError, OSError) as e:
+            # e.g. the daemon was stopped while the handler was running
+            raise RuntimeError(f"daemon closed the connection while running {handler}") from e
+
+    if error:
+        raise RuntimeError(error)
@@ -103,6 +103,8 @@ RightsPreCalc = Rights.update_columns(
 
 RightsCalcResult = Rights.select_columns(["amount"])
 
+# ratios of corporate actions are validated when parsed, see `ratios_to_float`,
+# which reports every invalid ratio of the table at once
 Splits = DataFrameSchema(
     index=MultiIndex(
         [
@@ -113,7 +115,7 @@ Splits = DataFrameSchema(
         strict=True,
     ),
     columns={
-        "ratio": Column(str, Check.str_matches(r"^[\d,]+:[\d]+$")),
+        "ratio": Column(str),
     },
     strict=True,
 )
@@ -129,7 +131,7 @@ Mergers = DataFrameSchema(
     ),
     columns={
         "acquirer": Column(str),
-        "ratio": Column(str, Check.str_matches(r"^[\d,]+:[\d]+$")),
+        "ratio": Column(str),
     },
     strict=True,
 )
@@ -145,7 +147,7 @@ SpinOffs = DataFrameSchema(
     ),
     columns={
         "new_company": Column(str),
-        "ratio": Column(str, Check.str_matches(r"^[\d,]+:[\d]+$")),
+        "ratio": Column(str),
         "cost_basis": Column(float, Check.gt(0)),
     },
     strict=True,
@@ -178,6 +180,10 @@ PositionsCalcResult = DataFrameSchema(
     strict=True,
 )
 
+PositionsHistoryCalcResult = PositionsCalcResult.update_column("symbol", unique=False).add_columns(
+    {"date": Column(Timestamp)}
+)
+
 PTAX = DataFrameSchema(
     index=Index(Timestamp, name="date", unique=True),
     columns={
@@ -187,6 +193,22 @@ PTAX = DataFrameSchema(
     strict=True,
 )
 
+MultiCurrencyPTAX = DataFrameSchema(
+    index=MultiIndex(
+        [
+            Index(str, name="currency"),
+            Index(Timestamp, name="date"),
+        ],
+        unique=["currency", "date"],
+        strict=True,
+    ),
+    columns={
+        "buying_rate": Column(float, Check.gt(0)),
+        "selling_rate": Column(float, Check.gt(0)),
+    },
+    strict=True,
+)
+
 USTrades = DataFrameSchema(
     index=MultiIndex(
         [Index(Timestamp, name="date")],
@@ -233,6 +255,10 @@ USPositionsCalcResult = PositionsCalcResult.add_columns(
     }
 )
 
+USPositionsHistoryCalcResult = USPositionsCalcResult.update_column(
+    "symbol", unique=False
+).add_columns({"date": Column(Timestamp)})
+
 USDividends = DataFrameSchema(
     index=Index(Timestamp, name="date"),
     columns={
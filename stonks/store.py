@@ -0,0 +1,121 @@
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+# local data, like caches of remote services, is kept out of git in data/
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    currency TEXT NOT NULL,
+    date TEXT NOT NULL,
+    buying_rate REAL NOT NULL,
+    selling_rate REAL NOT NULL,
+    PRIMARY KEY (currency, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    currency TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL
+);
+"""
+
+
+# On-disk cache of PTAX quotes backed by SQLite.
+#
+# Besides the quotes, the store records which date ranges were already
+# downloaded for each currency. Dates without quotes (weekends and holidays)
+# are part of the covered ranges, so they are never requested again.
+class PTAXStore:
+    def __init__(self, path: Path | str = DATA_DIR / "ptax.sqlite3"):
+        self.path = Path(path)
+
+    # A connection per operation, so the store can be used from any thread.
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.executescript(_SCHEMA)
+            # commits on success and rolls back on errors
+            with conn:
+                yield conn
+
+    # Date ranges between start and end (inclusive) not covered yet.
+    def missing(self, currency: str, start: date, end: date) -> list[tuple[date, date]]:
+        with self._connect() as conn:
+            covered = conn.execute(
+                "SELECT start, end FROM coverage"
+                " WHERE currency = ? AND start <= ? AND end >= ? ORDER BY start",
+                (currency, end.isoformat(), start.isoformat()),
+            ).fetchall()
+
+        gaps = []
+        cursor = start
+
+        for covered_start, covered_end in covered:
+            if date.fromisoformat(covered_start) > cursor:
+                gaps.append((cursor, date.fromisoformat(covered_start) - timedelta(days=1)))
+
+            cursor = max(cursor, date.fromisoformat(covered_end) + timedelta(days=1))
+
+        if cursor <= end:
+            gaps.append((cursor, end))
+
+        return gaps
+
+    # Saves quotes indexed by date and marks the range between start and end
+    # (inclusive) as covered, merging it with adjacent or overlapping ranges.
+    def save(self, currency: str, start: date, end: date, quotes: DataFrame) -> None:
+        rows = zip(
+            [currency] * len(quotes),
+            pd.DatetimeIndex(quotes.index).strftime("%Y-%m-%d"),
+            quotes.buying_rate.tolist(),
+            quotes.selling_rate.tolist(),
+        )
+
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?)", rows)
+
+            if start > end:
+                return
+
+            # ranges that touch the new one are merged into a single range
+            query = "FROM coverage WHERE currency = ? AND start <= ? AND end >= ?"
+            params = (
+                currency,
+                (end + timedelta(days=1)).isoformat(),
+                (start - timedelta(days=1)).isoformat(),
+            )
+            merged_start, merged_end = conn.execute(
+                f"SELECT MIN(start), MAX(end) {query}", params
+            ).fetchone()
+            conn.execute(f"DELETE {query}", params)
+            conn.execute(
+                "INSERT INTO coverage VALUES (?, ?, ?)",
+                (
+                    currency,
+                    min(start.isoformat(), merged_start or start.isoformat()),
+                    max(end.isoformat(), merged_end or end.isoformat()),
+                ),
+            )
+
+    # Quotes between start and end (inclusive) indexed by date.
+    def quotes(self, currency: str, start: date, end: date) -> DataFrame:
+        with self._connect() as conn:
+            quotes = pd.read_sql_query(
+                "SELECT date, buying_rate, selling_rate FROM quotes"
+                " WHERE currency = ? AND date BETWEEN ? AND ? ORDER BY date",
+                conn,
+                params=(currency, start.isoformat(), end.isoformat()),
+            )
+
+        quotes["date"] = pd.to_datetime(quotes.date, format="%Y-%m-%d")
+
+        return quotes.set_index("date")
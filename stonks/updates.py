@@ -0,0 +1,154 @@
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING
+
+from .store import PTAXStore
+from .workbook import BaseWorkbook
+
+if TYPE_CHECKING:
+    from .checkpoints import Checkpoints
+
+# Each update imports the calculation it runs, so importing the updates, like
+# handlers do, neither imports pandera nor builds the schemas of every table.
+
+
+# positions snapshots are kept in memory, so they are reused only while the
+# interpreter is alive (e.g. when xlwings runs with the UDF server)
+@cache
+def positions_checkpoints() -> "Checkpoints":
+    # like the positions engine, only imported by updates of positions
+    from .checkpoints import Checkpoints
+
+    return Checkpoints()
+
+
+# PTAX quotes are cached on disk, so they are downloaded only once
+ptax_store = PTAXStore()
+
+type _Run = Callable[[BaseWorkbook], None]
+
+
+# Calculation of a table, which reads the table itself, the `inputs` tables
+# and the `dates` inputs of the table, and writes its results to the table.
+# Updates that `replace` the table do not read it, they write it whole.
+# The `optional` inputs may be empty, like corporate actions of a portfolio
+# that never had any.
+# Updates run on any workbook, be it open in Excel or kept in files.
+@dataclass(frozen=True, slots=True)
+class Update:
+    table_name: str
+    inputs: tuple[str, ...]
+    dates: tuple[str, ...]
+    replaces: bool
+    optional: tuple[str, ...]
+    run: _Run
+
+
+# updates of every table that has one, by table name
+UPDATES: dict[str, Update] = {}
+
+
+def _update(
+    table_name: str,
+    inputs: Sequence[str] = (),
+    dates: Sequence[str] = (),
+    replaces: bool = False,
+    optional: Sequence[str] = (),
+) -> Callable[[_Run], _Run]:
+    def decorator(run: _Run) -> _Run:
+        UPDATES[table_name] = Update(
+            table_name, tuple(inputs), tuple(dates), replaces, tuple(optional), run
+        )
+        return run
+
+    return decorator
+
+
+@_update(
+    "positions",
+    inputs=["trades", "rights", "splits", "mergers", "spin_offs", "stock_dividends"],
+    dates=["date"],
+    replaces=True,
+    optional=["rights", "splits", "mergers", "spin_offs", "stock_dividends"],
+)
+def update_positions(wb: BaseWorkbook) -> None:
+    from .calculations import calc_positions
+
+    tables = wb.snapshot(["trades", "rights", "splits", "mergers", "spin_offs", "stock_dividends"])
+    positions = calc_positions(
+        date=wb.positions.date_input_value("date"),
+        trades=tables["trades"],
+        rights=tables["rights"],
+        splits=tables["splits"],
+        mergers=tables["mergers"],
+        spin_offs=tables["spin_offs"],
+        stock_dividends=tables["stock_dividends"],
+        checkpoints=positions_checkpoints(),
+    )
+    wb.positions.replace_with_df(positions)
+
+
+@_update("us_positions", inputs=["us_trades"], dates=["date"], replaces=True)
+def update_us_positions(wb: BaseWorkbook) -> None:
+    from .calculations import calc_us_positions
+
+    us_positions = calc_us_positions(
+        date=wb.us_positions.date_input_value("date"),
+        trades=wb.us_trades.to_df(),
+    )
+    wb.us_positions.replace_with_df(us_positions)
+
+
+@_update("trade_confirmations")
+def update_trade_confirmations(wb: BaseWorkbook) -> None:
+    from .calculations import calc_trade_confirmations_costs
+
+    trade_confirmations_costs = calc_trade_confirmations_costs(wb.trade_confirmations.to_df())
+    wb.trade_confirmations.update_from_df(trade_confirmations_costs)
+
+
+@_update("trades", inputs=["trade_confirmations"])
+def update_trades(wb: BaseWorkbook) -> None:
+    from .calculations import calc_trades_costs
+
+    trades_costs = calc_trades_costs(wb.trades.to_df(), wb.trade_confirmations.to_df())
+    wb.trades.update_from_df(trades_costs)
+
+
+@_update("rights")
+def update_rights(wb: BaseWorkbook) -> None:
+    from .calculations import calc_rights_amounts
+
+    rights_amounts = calc_rights_amounts(wb.rights.to_df())
+    wb.rights.update_from_df(rights_amounts)
+
+
+@_update("ptax", dates=["start_date", "end_date"], replaces=True)
+def update_ptax(wb: BaseWorkbook) -> None:
+    from .bcb import fetch_ptax_usd
+
+    ptax_usd_df = fetch_ptax_usd(
+        start_date=wb.ptax.date_input_value("start_date"),
+        end_date=wb.ptax.date_input_value("end_date"),
+        store=ptax_store,
+        # weekends and holidays are resolved by the calculations reading it
+        quotation_days_only=True,
+    )
+    wb.ptax.replace_with_df(ptax_usd_df, index=True)
+
+
+@_update("us_trades", inputs=["ptax"])
+def update_us_trades(wb: BaseWorkbook) -> None:
+    from .calculations import calc_us_trades
+
+    us_trades_ptax = calc_us_trades(trades=wb.us_trades.to_df(), ptax=wb.ptax.to_df())
+    wb.us_trades.update_from_df(us_trades_ptax)
+
+
+@_update("us_dividends", inputs=["ptax"])
+def update_us_dividends(wb: BaseWorkbook) -> None:
+    from .calculations import calc_us_dividends
+
+    us_dividends_ptax = calc_us_dividends(dividends=wb.us_dividends.to_df(), ptax=wb.ptax.to_df())
+    wb.us_dividends.update_from_df(us_dividends_ptax)
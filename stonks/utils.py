@@ -1,10 +1,29 @@
 from datetime import date, timedelta
 
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+from pandas import Series
 
-# Expects ratio to be expressed as A:B and to have comma (,) as decimal separator.
-def ratio_to_float(ratio: str) -> float:
-    a, b = (float(term.replace(",", ".")) for term in ratio.split(":"))
-    return a / b
+from .errors import InvalidRatioError
+
+
+# Converts ratios expressed as A:B, with comma (,) as decimal separator, to
+# A / B. All invalid ratios of the `table` are reported at once along with their
+# row positions, including those with terms that are not positive numbers.
+def ratios_to_float(ratios: Series, table: str) -> Series:
+    # ratios not matching A:B get NaN terms and are reported as invalid below
+    terms = ratios.astype(str).str.replace(",", ".", regex=False).str.extract(r"^([^:]*):([^:]*)$")
+    a = pd.to_numeric(terms[0], errors="coerce")
+    b = pd.to_numeric(terms[1], errors="coerce")
+    values = (a / b).astype(float)
+    invalid = ~np.isfinite(values.to_numpy()) | ~(a > 0).to_numpy() | ~(b > 0).to_numpy()
+
+    if invalid.any():
+        positions = np.flatnonzero(invalid)
+        raise InvalidRatioError(table, positions.tolist(), ratios.iloc[positions].tolist())
+
+    return values
 
 
 def reverse_dict(d: dict[str, str]) -> dict[str, str]:
@@ -20,3 +39,12 @@ def previous_month_15th(date: date) -> date:
     previous_month_15th = previous_month.replace(day=15)
 
     return previous_month_15th
+
+
+# Vectorized version of `previous_month_15th` for an array of dates.
+def previous_months_15th(dates: NDArray[np.datetime64]) -> NDArray[np.datetime64]:
+    previous_months = dates.astype("datetime64[M]") - np.timedelta64(1, "M")
+
+    previous_months_15th = previous_months.astype("datetime64[D]") + np.timedelta64(14, "D")
+
+    return np.asarray(previous_months_15th, dtype="datetime64[D]")
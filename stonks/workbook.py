@@ -0,0 +1,109 @@
+from collections.abc import Iterable
+from datetime import date
+from functools import cached_property
+from typing import Protocol
+
+from pandas import DataFrame
+
+from .mapping import TABLE_COLUMNS, TABLE_INDEXES, TABLE_VALUES
+from .utils import reverse_dict
+
+
+# Operations on a table needed by the calculations, implemented by each place
+# tables are kept in (see stonks.excel and stonks.files).
+class Table(Protocol):
+    def set_message(self, message: str) -> None: ...
+
+    def date_input_value(self, name: str) -> date: ...
+
+    def to_df(self) -> DataFrame: ...
+
+    def update_from_df(self, df: DataFrame) -> None: ...
+
+    def replace_with_df(self, df: DataFrame, index: bool = False) -> None: ...
+
+
+# Tables of the workbook. Subclasses tell how a table is accessed.
+class BaseWorkbook:
+    def _table(self, name: str) -> Table:
+        raise NotImplementedError
+
+    # Reads the given tables, one by one with Table.to_df, so reads are not
+    # batched across tables. How much each read costs is up to the table: in
+    # Excel it is a single call, and both Excel and file tables keep what they
+    # read in memory, so later reads of the same tables are not read again.
+    def snapshot(self, table_names: Iterable[str]) -> dict[str, DataFrame]:
+        tables: dict[str, Table] = {name: getattr(self, name) for name in table_names}
+        return {name: table.to_df() for name, table in tables.items()}
+
+    @cached_property
+    def positions(self) -> Table:
+        return self._table("positions")
+
+    @cached_property
+    def trade_confirmations(self) -> Table:
+        return self._table("trade_confirmations")
+
+    @cached_property
+    def trades(self) -> Table:
+        return self._table("trades")
+
+    @cached_property
+    def rights(self) -> Table:
+        return self._table("rights")
+
+    @cached_property
+    def splits(self) -> Table:
+        return self._table("splits")
+
+    @cached_property
+    def mergers(self) -> Table:
+        return self._table("mergers")
+
+    @cached_property
+    def spin_offs(self) -> Table:
+        return self._table("spin_offs")
+
+    @cached_property
+    def stock_dividends(self) -> Table:
+        return self._table("stock_dividends")
+
+    @cached_property
+    def ptax(self) -> Table:
+        return self._table("ptax")
+
+    @cached_property
+    def us_trades(self) -> Table:
+        return self._table("us_trades")
+
+    @cached_property
+    def us_positions(self) -> Table:
+        return self._table("us_positions")
+
+    @cached_property
+    def us_dividends(self) -> Table:
+        return self._table("us_dividends")
+
+
+# Converts a table laid out as in the workbook, with its headers and values
+# (see stonks.mapping), to a DataFrame as expected by the calculations.
+def from_sheet(name: str, df: DataFrame) -> DataFrame:
+    df = df.rename(columns=reverse_dict(TABLE_COLUMNS[name]), errors="raise")
+
+    if index := TABLE_INDEXES.get(name):
+        df = df.set_index(index)
+
+    if val_map := TABLE_VALUES.get(name):
+        df = df.replace(val_map)
+
+    return df
+
+
+# The reverse of `from_sheet`, the index is kept only when `index` is true.
+def to_sheet(name: str, df: DataFrame, index: bool = False) -> DataFrame:
+    df = df.reset_index() if index else df.reset_index(drop=True)
+
+    if val_map := TABLE_VALUES.get(name):
+        df = df.replace({column: reverse_dict(values) for column, values in val_map.items()})
+
+    return df.rename(columns=TABLE_COLUMNS[name])
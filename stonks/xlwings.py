@@ -1,94 +1,105 @@
-from collections.abc import Generator
-from contextlib import contextmanager
+from collections.abc import Callable
+from datetime import date, timedelta
+from functools import cache
+from typing import TYPE_CHECKING
 
 import xlwings as xw  # type: ignore
 
-from .bcb import fetch_ptax_usd
-from .calculations import (
-    calc_positions,
-    calc_rights_amounts,
-    calc_trade_confirmations_costs,
-    calc_trades_costs,
-    calc_us_dividends,
-    calc_us_positions,
-    calc_us_trades,
-)
 from .excel import Workbook
+from .fingerprints import Fingerprints, fingerprint
+from .graph import propagate
+from .updates import UPDATES, Update, ptax_store
 
+if TYPE_CHECKING:
+    from .prefetch import PTAXPrefetcher
 
-@contextmanager
-def _update_table(table_name: str) -> Generator[Workbook]:
-    wb = Workbook(xw.Book.caller())
-    table = getattr(wb, table_name)
 
-    table.set_message("Working...")
+# prefetching only outlives the handler that started it when xlwings runs
+# with the UDF server
+@cache
+def _ptax_prefetcher() -> "PTAXPrefetcher":
+    from .prefetch import PTAXPrefetcher
 
-    try:
-        yield (wb)
-        table.set_message("")
-    except Exception as e:
-        table.set_message(f"error: {e}")
+    return PTAXPrefetcher(ptax_store)
 
 
-def on_positions_date_update() -> None:
-    with _update_table("positions") as wb:
-        positions = calc_positions(
-            date=wb.positions.date_input_value("date"),
-            trades=wb.trades.to_df(),
-            rights=wb.rights.to_df(),
-            splits=wb.splits.to_df(),
-            mergers=wb.mergers.to_df(),
-            spin_offs=wb.spin_offs.to_df(),
-            stock_dividends=wb.stock_dividends.to_df(),
-        )
-        wb.positions.replace_with_df(positions)
+# like PTAX quotes, fingerprints of the last calculations are kept on disk
+_fingerprints = Fingerprints()
 
 
-def on_us_positions_date_update() -> None:
-    with _update_table("us_positions") as wb:
-        us_positions = calc_us_positions(
-            date=wb.us_positions.date_input_value("date"),
-            trades=wb.us_trades.to_df(),
-        )
-        wb.us_positions.replace_with_df(us_positions)
+# Fingerprint of the tables read by an update, the updated table included, and
+# of its date inputs.
+def _fingerprint(wb: Workbook, update: Update) -> str:
+    table = getattr(wb, update.table_name)
+    values = {name: table.date_input_value(name) for name in update.dates}
 
+    # results of calculations with date inputs also depend on the current date
+    # (e.g. PTAX rates published later or rights issued later)
+    if update.dates:
+        values["today"] = date.today()
 
-def on_trade_confirmations_update() -> None:
-    with _update_table("trade_confirmations") as wb:
-        trade_confirmations_costs = calc_trade_confirmations_costs(wb.trade_confirmations.to_df())
-        wb.trade_confirmations.update_from_df(trade_confirmations_costs)
+    return fingerprint(wb.snapshot([update.table_name, *update.inputs]), values)
 
 
-def on_trades_update() -> None:
-    with _update_table("trades") as wb:
-        trades_costs = calc_trades_costs(wb.trades.to_df(), wb.trade_confirmations.to_df())
-        wb.trades.update_from_df(trades_costs)
+# Runs the update of `table_name`, unless the tables and dates it reads are the
+# same as in its last successful run. Errors are shown in the message box and
+# raised again, so tables that read this one are not updated.
+def _run(wb: Workbook, table_name: str) -> None:
+    update = UPDATES[table_name]
+    table = getattr(wb, table_name)
+
+    table.set_message("Working...")
 
+    try:
+        if _fingerprints.get(table_name) == _fingerprint(wb, update):
+            table.set_message("skipped: inputs unchanged")
+            return
+
+        update.run(wb)
+        # written tables are read again, so the fingerprint matches what they
+        # hold now
+        _fingerprints.save(table_name, _fingerprint(wb, update))
+        table.set_message("")
+    except Exception as e:
+        table.set_message(f"error: {e}")
+        raise
 
-def on_rights_update() -> None:
-    with _update_table("rights") as wb:
-        rights_amounts = calc_rights_amounts(wb.rights.to_df())
-        wb.rights.update_from_df(rights_amounts)
 
+# Handler that runs the update of `table_name` on the workbook calling it, or
+# on `book` when run by the daemon (see stonks.daemon), and then the updates of
+# the tables that read it, directly or not (see stonks.graph). Each table is
+# updated once, after the tables it reads, so none is left with stale results.
+def _handler(table_name: str) -> Callable[[xw.Book | None], None]:
+    def handler(book: xw.Book | None = None) -> None:
+        wb = Workbook(xw.Book.caller() if book is None else book)
+        # errors were shown by the tables that failed
+        _, not_run = propagate([table_name], lambda name: _run(wb, name))
 
-def on_ptax_dates_update() -> None:
-    with _update_table("ptax") as wb:
-        ptax_usd_df = fetch_ptax_usd(
-            start_date=wb.ptax.date_input_value("start_date"),
-            end_date=wb.ptax.date_input_value("end_date"),
-        )
-        wb.ptax.replace_with_df(ptax_usd_df, index=True)
+        for name in not_run:
+            getattr(wb, name).set_message("skipped: inputs failed")
 
+    return handler
 
-def on_us_trades_update() -> None:
-    with _update_table("us_trades") as wb:
-        us_trades_ptax = calc_us_trades(trades=wb.us_trades.to_df(), ptax=wb.ptax.to_df())
-        wb.us_trades.update_from_df(us_trades_ptax)
 
+# Opt-in handler to be called when the workbook is opened. Keeps the PTAX store
+# up to date in the background, so `on_ptax_dates_update` does not wait for
+# the BCB. Errors are shown in the message box of the PTAX table.
+def on_workbook_open(book: xw.Book | None = None) -> None:
+    wb = Workbook(xw.Book.caller() if book is None else book)
 
-def on_us_dividends_update() -> None:
-    with _update_table("us_dividends") as wb:
-        us_dividends_ptax = calc_us_dividends(
-            dividends=wb.us_dividends.to_df(), ptax=wb.ptax.to_df()
+    try:
+        _ptax_prefetcher().schedule(
+            start_date=wb.ptax.date_input_value("start_date"), interval=timedelta(hours=1)
         )
-        wb.us_dividends.update_from_df(us_dividends_ptax)
+    except Exception as e:
+        wb.ptax.set_message(f"error: {e}")
+
+
+on_positions_date_update = _handler("positions")
+on_us_positions_date_update = _handler("us_positions")
+on_trade_confirmations_update = _handler("trade_confirmations")
+on_trades_update = _handler("trades")
+on_rights_update = _handler("rights")
+on_ptax_dates_update = _handler("ptax")
+on_us_trades_update = _handler("us_trades")
+on_us_dividends_update = _handler("us_dividends")
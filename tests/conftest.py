@@ -1,7 +1,11 @@
 from pandas import read_csv
 from pytest import fixture
 
+from stonks import bcb
+from stonks.client import HTTPClient
+
 from .helpers import fixture_path
+from .ptax_server import PTAXServer
 
 
 @fixture
@@ -101,17 +105,18 @@ def stock_dividends_df():
 def events_df():
     return read_csv(
         fixture_path("events.csv"),
+        dtype={"event": "category", "type": "category", "symbol": "category", "code": "int8"},
         parse_dates=["date", "start", "end", "settlement", "issue_date"],
     )
 
 
 @fixture
-def events_filtered_df():
+def events_filtered_df(events_df):
     return read_csv(
         fixture_path("events-filtered.csv"),
-        dtype={"acquirer": object, "new_company": object},
+        dtype={"acquirer": object, "new_company": object, "code": "int8"},
         parse_dates=["date", "start", "end", "settlement", "issue_date"],
-    )
+    ).astype(events_df.dtypes[["event", "type", "symbol"]].to_dict())
 
 
 @fixture
@@ -152,3 +157,14 @@ def us_dividends_df():
 @fixture
 def us_dividends_ptax_df():
     return read_csv(fixture_path("us-dividends-ptax.csv"), parse_dates=["date"], index_col=["date"])
+
+
+# Local stand-in for the BCB service used by every PTAX download.
+@fixture
+def ptax_server(monkeypatch):
+    with PTAXServer() as server:
+        monkeypatch.setattr("stonks.bcb._PTAX_URL", server.url)
+        monkeypatch.setattr("stonks.bcb._PTAX_CURRENCY_URL", server.currency_url)
+        monkeypatch.setattr("stonks.bcb._client", HTTPClient(backoff=0))
+        yield server
+        bcb._client.close()
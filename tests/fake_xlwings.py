@@ -0,0 +1,182 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+import pandas as pd
+
+from stonks.mapping import SHEET_NAMES, TABLE_COLUMNS, TABLE_VALUES
+
+
+# Stand-in for the parts of the xlwings API used by stonks.excel. Every call
+# that would be a round trip to Excel is counted and takes `latency` seconds,
+# cells written are counted too.
+class FakeExcel:
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.calls = 0
+        self.writes = 0
+        self.cells = 0
+
+    def call(self, write: bool = False, cells: int = 0) -> None:
+        self.calls += 1
+        self.writes += write
+        self.cells += cells
+        time.sleep(self.latency)
+
+
+# A rectangular region of a grid of cells, the grid is a list of rows.
+class FakeRange:
+    def __init__(
+        self, excel: FakeExcel, grid: list[list[Any]], row: int, col: int, rows: int, cols: int
+    ):
+        self._excel = excel
+        self._grid = grid
+        self._row = row
+        self._col = col
+        self._rows = rows
+        self._cols = cols
+        self._ndim: int | None = None
+
+    def options(self, ndim: int | None = None, **kwargs: Any) -> "FakeRange":
+        options = FakeRange(self._excel, self._grid, self._row, self._col, self._rows, self._cols)
+        options._ndim = ndim
+        return options
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._rows, self._cols
+
+    def __getitem__(self, key: tuple[slice, slice]) -> "FakeRange":
+        row1, row2, _ = key[0].indices(self._rows)
+        col1, col2, _ = key[1].indices(self._cols)
+
+        return FakeRange(
+            self._excel, self._grid, self._row + row1, self._col + col1, row2 - row1, col2 - col1
+        )
+
+    @property
+    def value(self) -> Any:
+        self._excel.call()
+        rows = self._grid[self._row : self._row + self._rows]
+        values = [row[self._col : self._col + self._cols] for row in rows]
+
+        return values[0] if self._ndim == 1 else values
+
+    # Expects values as written by stonks.excel, without index and header.
+    @value.setter
+    def value(self, value: Any) -> None:
+        values = _to_cells(pd.DataFrame(value))
+        self._excel.call(write=True, cells=self._rows * self._cols)
+
+        assert len(values) == self._rows
+        assert all(len(row) == self._cols for row in values)
+
+        for i, row in enumerate(values):
+            self._grid[self._row + i][self._col : self._col + self._cols] = row
+
+
+class FakeCell:
+    def __init__(self, excel: FakeExcel, value: Any = None):
+        self._excel = excel
+        self._value = value
+
+    @property
+    def value(self) -> Any:
+        self._excel.call()
+        return self._value
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        self._excel.call(write=True)
+        self._value = value
+
+
+class FakeTable:
+    def __init__(self, excel: FakeExcel, name: str, grid: list[list[Any]]):
+        self._excel = excel
+        self.name = name
+        # first row holds the headers, and the last one the totals when shown
+        self.grid = grid
+        self.show_totals = False
+
+    @property
+    def range(self) -> FakeRange:
+        self._excel.call()
+        return FakeRange(self._excel, self.grid, 0, 0, len(self.grid), len(self.grid[0]))
+
+    @property
+    def header_row_range(self) -> FakeRange:
+        self._excel.call()
+        return FakeRange(self._excel, self.grid, 0, 0, 1, len(self.grid[0]))
+
+    # None when the table has no rows, like in xlwings
+    @property
+    def data_body_range(self) -> FakeRange | None:
+        self._excel.call()
+        rows = len(self.grid) - 1 - self.show_totals
+        return FakeRange(self._excel, self.grid, 1, 0, rows, len(self.grid[0])) if rows else None
+
+    def update(self, df: pd.DataFrame, index: bool = True) -> None:
+        df = df.reset_index() if index else df
+        self._excel.call(write=True, cells=df.size + len(df.columns))
+        totals = self.grid[-1:] if self.show_totals else []
+        self.grid[:] = [list(df.columns), *_to_cells(df), *totals]
+
+
+class FakeSheet:
+    def __init__(self, excel: FakeExcel):
+        self._excel = excel
+        self.tables: dict[str, FakeTable] = {}
+        self.cells: dict[str, FakeCell] = {}
+
+    def range(self, name: str) -> FakeCell:
+        return self.cells.setdefault(name, FakeCell(self._excel))
+
+
+class FakeApp:
+    @contextmanager
+    def properties(self, **kwargs: Any) -> Any:
+        yield
+
+
+class FakeBook:
+    def __init__(self, excel: FakeExcel):
+        self.app = FakeApp()
+        self.sheets = {name: FakeSheet(excel) for name in SHEET_NAMES.values()}
+
+
+def _to_cells(df: pd.DataFrame) -> list[list[Any]]:
+    # Excel has no NaN nor pandas timestamps
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        [v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row]
+        for row in df.itertuples(index=False)
+    ]
+
+
+# Builds a workbook with the given tables, as returned by `Table.to_df`, and
+# named cells, like dates, of each sheet.
+def make_book(
+    tables: dict[str, pd.DataFrame],
+    cells: dict[str, dict[str, Any]] | None = None,
+    latency: float = 0,
+) -> tuple[FakeBook, FakeExcel]:
+    excel = FakeExcel(latency)
+    book = FakeBook(excel)
+
+    for name, df in tables.items():
+        col_map = TABLE_COLUMNS[name]
+        df = df.reset_index()[[c for c in col_map if c in df.reset_index()]]
+        df = df.replace(
+            {c: {v: k for k, v in m.items()} for c, m in TABLE_VALUES.get(name, {}).items()}
+        )
+        grid = [[col_map[c] for c in df.columns], *_to_cells(df)]
+        book.sheets[SHEET_NAMES[name]].tables[name] = FakeTable(excel, name, grid)
+
+    for name, values in (cells or {}).items():
+        for cell, value in values.items():
+            value = datetime.combine(value, datetime.min.time()) if value is not None else None
+            book.sheets[SHEET_NAMES[name]].cells[cell] = FakeCell(excel, value)
+
+    return book, excel
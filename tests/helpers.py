@@ -1,3 +1,6 @@
+import subprocess
+import sys
+import time
 from pathlib import Path
 
 import pandas as pd
@@ -9,3 +12,35 @@ def fixture_path(fixture):
 
 def make_event(**data):
     return pd.Series(data)
+
+
+# Waits for `condition` to hold, checked every millisecond, for up to `timeout`
+# seconds, so a regression fails the test instead of hanging it.
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"condition not met in {timeout} seconds")
+
+        time.sleep(0.001)
+
+
+# Self and cumulative microseconds by module, as reported by -X importtime.
+def import_times(module):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    times = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
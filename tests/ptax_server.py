@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_PATH = "/olinda/servico/PTAX/versao/v1/odata/"
+_USD_RESOURCE = "CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+_CURRENCY_RESOURCE = (
+    "CotacaoMoedaPeriodo(moeda=@moeda,dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+)
+_BASE_RATES = {"USD": 4, "EUR": 5, "GBP": 6}
+
+
+# Rates are derived from the currency and date, so any range can be compared
+# with another one downloaded differently.
+def rate(day: date, currency: str = "USD") -> float:
+    return round(_BASE_RATES[currency] + (day.toordinal() % 1000) / 1000, 4)
+
+
+def _format_rate(value: float) -> str:
+    return f'"{value:.4f}"'.replace(".", ",")
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "'%m-%d-%Y'").date()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    server: "PTAXServer"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+
+        if url.path not in (_PATH + _USD_RESOURCE, _PATH + _CURRENCY_RESOURCE):
+            self.send_error(404)
+            return
+
+        qs = parse_qs(url.query)
+        currency = qs["@moeda"][0].strip("'") if "@moeda" in qs else "USD"
+        start_date = _parse_date(qs["@dataInicial"][0])
+        end_date = _parse_date(qs["@dataFinalCotacao"][0])
+
+        with self.server.lock:
+            self.server.requests.append((currency, start_date, end_date))
+            fail = self.server.failures > 0
+            self.server.failures -= fail
+
+        if fail:
+            # drop the connection without answering
+            self.close_connection = True
+            return
+
+        if "@moeda" in qs:
+            # every bulletin of the day, filters are ignored
+            lines = [
+                "paridadeCompra,paridadeVenda,cotacaoCompra,cotacaoVenda,dataHoraCotacao,tipoBoletim"
+            ]
+            bulletins = [("Abertura", 0.01, "10:09:00.123"), ("Fechamento", 0, "13:05:02.267")]
+        else:
+            lines = ["cotacaoCompra,cotacaoVenda,dataHoraCotacao"]
+            bulletins = [("", 0, "13:05:02.267")]
+
+        day = start_date
+
+        while day <= end_date:
+            # BCB only publishes quotes on business days
+            for bulletin, offset, time_of_day in bulletins if day.weekday() < 5 else []:
+                buying = rate(day, currency) + offset
+                row = [_format_rate(buying), _format_rate(buying + 0.0006), f"{day} {time_of_day}"]
+
+                if bulletin:
+                    row = ['"1,0000"', '"1,0000"', *row, bulletin]
+
+                lines.append(",".join(row))
+
+            day += timedelta(days=1)
+
+        body = "\r\n".join(lines).encode() + b"\r\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+# Local stand-in for the BCB PTAX service, answering each request after
+# `latency` seconds. The first `failures` requests are dropped.
+class PTAXServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.failures = failures
+        self.requests: list[tuple[str, date, date]] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{_PATH}{_USD_RESOURCE}"
+
+    @property
+    def currency_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{_PATH}{_CURRENCY_RESOURCE}"
+
+    def __enter__(self) -> "PTAXServer":
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.shutdown()
+        self.server_close()
@@ -1,19 +1,37 @@
-from datetime import date
+from contextlib import contextmanager
+from datetime import date, timedelta
 
 import pandas as pd
 import pytest
+from numpy.testing import assert_array_equal
 from pandas import to_datetime as dt
 from pandas.testing import assert_frame_equal
 from vcr import use_cassette
 
-from stonks.bcb import fetch_ptax_usd
+from stonks import bcb
+from stonks.bcb import fetch_ptax, fetch_ptax_usd
+from stonks.ptax import PTAXIndex
+from stonks.store import PTAXStore
+
+from .ptax_server import rate
+
+
+# connections are reused between requests, but must not outlive the cassette
+# that patched them
+@contextmanager
+def ptax_cassette(name):
+    with use_cassette(f"tests/fixtures/vcr_cassettes/{name}") as c:
+        try:
+            yield c
+        finally:
+            bcb._client.close()
 
 
 def test_fetch_ptax_usd():
     start_date = date(2023, 1, 1)
     end_date = date(2023, 2, 1)
 
-    with use_cassette("tests/fixtures/vcr_cassettes/ptax_usd.yaml"):
+    with ptax_cassette("ptax_usd.yaml"):
         results = fetch_ptax_usd(start_date=start_date, end_date=end_date)
 
         expected = (
@@ -72,7 +90,7 @@ def test_fetch_ptax_usd_weekends_and_holidays():
     start_date = date(2023, 2, 18)
     end_date = date(2023, 2, 26)
 
-    with use_cassette("tests/fixtures/vcr_cassettes/ptax_usd_weekends_and_holidays.yaml"):
+    with ptax_cassette("ptax_usd_weekends_and_holidays.yaml"):
         results = fetch_ptax_usd(start_date=start_date, end_date=end_date)
 
         expected = (
@@ -94,3 +112,171 @@ def test_fetch_ptax_usd_weekends_and_holidays():
         )
 
         assert_frame_equal(results, expected)
+
+
+def test_fetch_ptax_usd_with_store(tmp_path):
+    start_date = date(2023, 1, 1)
+    end_date = date(2023, 2, 1)
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+
+    with ptax_cassette("ptax_usd.yaml"):
+        expected = fetch_ptax_usd(start_date=start_date, end_date=end_date)
+
+    with ptax_cassette("ptax_usd.yaml") as cassette:
+        results = fetch_ptax_usd(start_date=start_date, end_date=end_date, store=store)
+        # the whole range is read from the store, no requests are made
+        cached_results = fetch_ptax_usd(start_date=start_date, end_date=end_date, store=store)
+        # a subset of the range is read from the store as well
+        subset_results = fetch_ptax_usd(
+            start_date=date(2023, 1, 10), end_date=date(2023, 1, 20), store=store
+        )
+
+        assert cassette.play_count == 1
+
+    assert_frame_equal(results, expected)
+    assert_frame_equal(cached_results, expected)
+    assert_frame_equal(subset_results, expected.loc["2023-01-10":"2023-01-20"].asfreq("D"))
+
+
+# Stand-in for _download_ptax that returns quotes for the given dates only and
+# records the requested ranges.
+def fake_download(monkeypatch, published):
+    requests = []
+
+    def download(currency, start_date, end_date):
+        requests.append((start_date, end_date))
+        days = [day for day in published if start_date <= day <= end_date]
+        return pd.DataFrame(
+            {"buying_rate": [5.0] * len(days), "selling_rate": [5.1] * len(days)},
+            index=pd.DatetimeIndex(days, name="date"),
+        )
+
+    monkeypatch.setattr("stonks.bcb._download_ptax", download)
+
+    return requests
+
+
+def test_fetch_ptax_usd_with_store_covers_today_once_published(tmp_path, monkeypatch):
+    today = date.today()
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    requests = fake_download(monkeypatch, [today - timedelta(days=7), today])
+
+    fetch_ptax_usd(start_date=today, end_date=today, store=store)
+    fetch_ptax_usd(start_date=today, end_date=today + timedelta(days=30), store=store)
+
+    # today's closing rate is stored, and there are no rates after today
+    assert requests == [(today - timedelta(days=7), today)]
+
+
+def test_fetch_ptax_usd_with_store_does_not_cover_today_until_published(tmp_path, monkeypatch):
+    today = date.today()
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    requests = fake_download(monkeypatch, [today - timedelta(days=7)])
+
+    fetch_ptax_usd(start_date=today, end_date=today, store=store)
+    fetch_ptax_usd(start_date=today, end_date=today, store=store)
+
+    assert requests == [(today - timedelta(days=7), today), (today, today)]
+
+
+# PTAX rates returned by the local server, filled on weekends
+def expected_ptax(currency, start_date, end_date):
+    days = pd.date_range(start_date, end_date, name="date")
+    business_days = days.where(days.weekday < 5).to_series().ffill()
+    buying_rates = [rate(day.date(), currency) for day in business_days]
+
+    return pd.DataFrame(
+        {
+            "buying_rate": buying_rates,
+            "selling_rate": [round(rate + 0.0006, 4) for rate in buying_rates],
+        },
+        index=days,
+    )
+
+
+def test_fetch_ptax_usd_in_chunks(ptax_server):
+    start_date = date(2015, 1, 1)
+    end_date = date(2023, 12, 31)
+
+    results = fetch_ptax_usd(start_date=start_date, end_date=end_date)
+
+    # the extra week requested before the start date is part of the first chunk
+    requests = sorted((start, end) for _, start, end in ptax_server.requests)
+    assert requests[0][0] == start_date - timedelta(days=7)
+    assert requests[-1][1] == end_date
+    assert all(end - start < timedelta(days=366) for start, end in requests)
+    assert all(a[1] + timedelta(days=1) == b[0] for a, b in zip(requests, requests[1:]))
+    # connections are reused by the threads downloading chunks
+    assert ptax_server.connections < len(requests)
+
+    # 2015-01-01 is a Thursday, so every date is filled from a business day
+    assert_frame_equal(results, expected_ptax("USD", start_date, end_date))
+
+
+def test_fetch_ptax_usd_in_chunks_with_store(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+
+    expected = fetch_ptax_usd(date(2020, 1, 1), date(2023, 12, 31))
+    ptax_server.requests.clear()
+
+    fetch_ptax_usd(date(2020, 1, 1), date(2020, 12, 31), store=store)
+    fetch_ptax_usd(date(2023, 1, 1), date(2023, 12, 31), store=store)
+    ptax_server.requests.clear()
+    results = fetch_ptax_usd(date(2020, 1, 1), date(2023, 12, 31), store=store)
+
+    # only the dates in between are downloaded by the last call, in chunks
+    assert sorted(ptax_server.requests) == [
+        ("USD", date(2021, 1, 1), date(2022, 1, 1)),
+        ("USD", date(2022, 1, 2), date(2022, 12, 24)),
+    ]
+    assert_frame_equal(results, expected)
+
+
+def test_fetch_ptax(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    currencies = ["EUR", "USD", "GBP"]
+    start_date = date(2021, 1, 4)
+    end_date = date(2023, 12, 31)
+
+    results = fetch_ptax(currencies, start_date, end_date, store=store)
+
+    # currencies are downloaded in a single batch of 4 chunks each
+    assert len(ptax_server.requests) == 12
+    # and only once, as they are kept in the same store
+    fetch_ptax(currencies, start_date, end_date, store=store)
+    assert len(ptax_server.requests) == 12
+
+    expected = pd.concat(
+        [expected_ptax(currency, start_date, end_date) for currency in currencies],
+        keys=currencies,
+        names=["currency"],
+    )
+
+    # the opening bulletins of EUR and GBP are ignored
+    assert_frame_equal(results, expected)
+    assert_frame_equal(
+        fetch_ptax_usd(start_date, end_date, store=store), results.loc["USD"].asfreq("D")
+    )
+
+
+def test_fetch_ptax_with_invalid_inputs():
+    with pytest.raises(ValueError, match="start_date must be less than or equal than end_date"):
+        fetch_ptax(["EUR"], start_date=date(2022, 12, 2), end_date=date(2022, 12, 1))
+
+
+def test_fetch_ptax_usd_quotation_days_only(ptax_server):
+    # 2023-01-01 is a Sunday and 2023-12-30 a Saturday
+    start_date = date(2023, 1, 1)
+    end_date = date(2023, 12, 30)
+
+    ptax = fetch_ptax_usd(start_date, end_date)
+    results = fetch_ptax_usd(start_date, end_date, quotation_days_only=True)
+
+    # weekends are left out, except for the start and end dates
+    assert results.index[0] == pd.Timestamp(start_date)
+    assert results.index[-1] == pd.Timestamp(end_date)
+    assert (results.index[1:-1].weekday < 5).all()
+    assert len(results) == 260 + 2
+    # and resolve to the same rates as the forward filled table
+    assert_frame_equal(results, ptax.loc[results.index])
+    assert_array_equal(PTAXIndex(results).selling_rates(ptax.index), ptax.selling_rate.to_numpy())
@@ -1,16 +1,22 @@
 from datetime import date
 
+import pandas as pd
+import pytest
 from pandas.testing import assert_frame_equal
 
 from stonks.calculations import (
     calc_positions,
+    calc_positions_history,
     calc_rights_amounts,
     calc_trade_confirmations_costs,
     calc_trades_costs,
     calc_us_dividends,
     calc_us_positions,
+    calc_us_positions_history,
     calc_us_trades,
 )
+from stonks.checkpoints import Checkpoints
+from stonks.errors import InvalidRatioError
 
 
 def test_calc_trade_confirmations_costs(trade_confirmations_df, trade_confirmations_costs_df):
@@ -31,7 +37,9 @@ def test_calc_rights_amounts(rights_df, rights_amounts_df):
     assert_frame_equal(results, rights_amounts_df)
 
 
+@pytest.mark.parametrize("engine", ["iterrows", "itertuples"])
 def test_calc_positions(
+    engine,
     positions_df,
     trades_with_costs_df,
     rights_with_amounts_df,
@@ -48,30 +56,132 @@ def test_calc_positions(
         mergers=mergers_df,
         spin_offs=spin_offs_df,
         stock_dividends=stock_dividends_df,
+        engine=engine,
     )
 
     assert_frame_equal(actual_positions, positions_df)
 
 
-def test_calc_us_trades(us_trades_df, ptax_df, us_trades_ptax_df):
-    results = calc_us_trades(us_trades_df, ptax_df)
+def test_calc_positions_with_invalid_ratio(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    # passes the schema, the ratio is reported along with its table
+    spin_offs = spin_offs_df.assign(ratio=["1:0"] * len(spin_offs_df))
+
+    with pytest.raises(InvalidRatioError, match=r"invalid ratios in SpinOffs: '1:0' \(row 0\)"):
+        calc_positions(
+            date=date.today(),
+            trades=trades_with_costs_df,
+            rights=rights_with_amounts_df,
+            splits=splits_df,
+            mergers=mergers_df,
+            spin_offs=spin_offs,
+            stock_dividends=stock_dividends_df,
+        )
+
+
+def test_calc_positions_with_checkpoints(
+    positions_df,
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    checkpoints = Checkpoints()
+
+    for _ in range(2):
+        actual_positions = calc_positions(
+            date=date.today(),
+            trades=trades_with_costs_df,
+            rights=rights_with_amounts_df,
+            splits=splits_df,
+            mergers=mergers_df,
+            spin_offs=spin_offs_df,
+            stock_dividends=stock_dividends_df,
+            checkpoints=checkpoints,
+        )
+
+        assert_frame_equal(actual_positions, positions_df)
+
+
+def test_calc_positions_history(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    inputs = {
+        "trades": trades_with_costs_df,
+        "rights": rights_with_amounts_df,
+        "splits": splits_df,
+        "mergers": mergers_df,
+        "spin_offs": spin_offs_df,
+        "stock_dividends": stock_dividends_df,
+    }
+    dates = [date(2022, 1, 10), date(2022, 2, 15), date.today()]
+
+    history = calc_positions_history(dates=dates, **inputs)
+
+    expected = pd.concat(
+        [calc_positions(date=d, **inputs).assign(date=pd.Timestamp(d)) for d in dates],
+        ignore_index=True,
+    )
+    assert_frame_equal(history, expected[history.columns])
+
+
+# PTAX table without the dates forward filled, except for its first and last
+# dates, like the one returned with `quotation_days_only`
+def quotation_days_only(ptax_df):
+    filled = (ptax_df == ptax_df.shift()).all(axis="columns")
+    filled.iloc[[0, -1]] = False
+
+    return ptax_df[~filled]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_calc_us_trades(compact, us_trades_df, ptax_df, us_trades_ptax_df):
+    ptax = quotation_days_only(ptax_df) if compact else ptax_df
+    results = calc_us_trades(us_trades_df, ptax)
 
     assert_frame_equal(results, us_trades_ptax_df)
 
 
+@pytest.mark.parametrize("engine", ["iterrows", "itertuples"])
 def test_calc_us_positions(
+    engine,
     us_positions_df,
     us_trades_with_ptax_df,
 ):
     actual_positions = calc_us_positions(
         date=date.today(),
         trades=us_trades_with_ptax_df,
+        engine=engine,
     )
 
     assert_frame_equal(actual_positions, us_positions_df)
 
 
-def test_calc_us_dividends(us_dividends_df, ptax_df, us_dividends_ptax_df):
-    results = calc_us_dividends(us_dividends_df, ptax_df)
+def test_calc_us_positions_history(us_positions_df, us_trades_with_ptax_df):
+    history = calc_us_positions_history(dates=None, trades=us_trades_with_ptax_df)
+
+    assert history.date.nunique() == 8
+
+    latest = history[history.date == history.date.max()].drop(columns="date")
+    assert_frame_equal(latest.reset_index(drop=True), us_positions_df)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_calc_us_dividends(compact, us_dividends_df, ptax_df, us_dividends_ptax_df):
+    ptax = quotation_days_only(ptax_df) if compact else ptax_df
+    results = calc_us_dividends(us_dividends_df, ptax)
 
     assert_frame_equal(results, us_dividends_ptax_df)
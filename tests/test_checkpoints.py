@@ -0,0 +1,106 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from pandas import to_datetime as dt
+from pandas.testing import assert_frame_equal
+
+from stonks.checkpoints import Checkpoints
+from stonks.events import concat_events, filter_by_date, replay
+from stonks.positions import Positions
+
+
+@pytest.fixture
+def events(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    events = concat_events(
+        {
+            "trade": trades_with_costs_df,
+            "right": rights_with_amounts_df,
+            "split": splits_df,
+            "merger": mergers_df,
+            "spin_off": spin_offs_df,
+            "stock_dividend": stock_dividends_df,
+        }
+    )
+
+    return filter_by_date(events=events, date=date.today())
+
+
+def full_replay(events):
+    positions = Positions()
+    replay(positions, events)
+
+    return positions.to_df()
+
+
+def test_replay(events):
+    checkpoints = Checkpoints()
+
+    assert_frame_equal(checkpoints.replay(events).to_df(), full_replay(events))
+    # one snapshot for each month end between the first and the last event
+    assert len(checkpoints) == 3
+
+
+def test_replay_from_snapshot(events):
+    checkpoints = Checkpoints()
+    checkpoints.replay(events)
+
+    # tamper with the latest snapshot to make sure it is the one being restored
+    _, positions = checkpoints._snapshots[dt("2022-03-31")]
+    positions.update("ZZZ", quantity=1.0, cost=1.0, cost_per_share=1.0)
+
+    assert "ZZZ" in checkpoints.replay(events).to_df().index
+
+
+def test_replay_with_earlier_event_changed(events):
+    checkpoints = Checkpoints()
+    checkpoints.replay(events)
+
+    _, positions = checkpoints._snapshots[dt("2022-03-31")]
+    positions.update("ZZZ", quantity=1.0, cost=1.0, cost_per_share=1.0)
+
+    changed_events = events.copy()
+    changed_events.loc[0, "quantity"] = 10.0
+
+    result = checkpoints.replay(changed_events).to_df()
+
+    assert "ZZZ" not in result.index
+    assert_frame_equal(result, full_replay(changed_events))
+
+
+def test_replay_with_later_event_added(events):
+    checkpoints = Checkpoints()
+    checkpoints.replay(events)
+
+    _, positions = checkpoints._snapshots[dt("2022-03-31")]
+    positions.update("ZZZ", quantity=1.0, cost=1.0, cost_per_share=1.0)
+
+    # a trade of a new symbol changes the categories of symbols, but not the
+    # events before it
+    trade = events[events.event == "trade"].iloc[[-1]].astype({"symbol": str, "type": str})
+    trade = trade.assign(date=events.date.iloc[-1], symbol="NEW", type="buy")
+    added_events = pd.concat([events, trade], ignore_index=True).astype(
+        {"symbol": "category", "type": "category"}
+    )
+
+    assert "ZZZ" in checkpoints.replay(added_events).to_df().index
+
+
+def test_replay_up_to_an_earlier_date(events):
+    checkpoints = Checkpoints()
+    checkpoints.replay(events)
+
+    earlier_events = events[events.date <= "2022-02-15"]
+
+    assert_frame_equal(checkpoints.replay(earlier_events).to_df(), full_replay(earlier_events))
+
+
+def test_replay_without_events(events):
+    assert Checkpoints().replay(events.iloc[0:0]).to_df().empty
@@ -0,0 +1,110 @@
+import json
+
+from pandas.testing import assert_frame_equal
+from pytest import fixture, mark
+
+from stonks.cli import STAGES, main, run_portfolio
+from stonks.files import FileWorkbook
+
+
+@fixture
+def portfolio(tmp_path, trade_confirmations_df, trades_df, us_dividends_df, ptax_df):
+    def make(name):
+        path = tmp_path / name
+        wb = FileWorkbook(path)
+        wb.trade_confirmations.replace_with_df(trade_confirmations_df, index=True)
+        wb.trades.replace_with_df(trades_df, index=True)
+        wb.us_dividends.replace_with_df(us_dividends_df, index=True)
+        wb.ptax.replace_with_df(ptax_df, index=True)
+        return path
+
+    return make
+
+
+def test_run_portfolio(
+    portfolio, trade_confirmations_with_costs_df, trades_with_costs_df, us_dividends_ptax_df
+):
+    path = portfolio("a")
+
+    timings, errors = run_portfolio(path)
+
+    assert errors == []
+    assert [stage for stage, seconds in timings.items() if seconds is not None] == [
+        "trade_confirmations",
+        "trades",
+        "us_dividends",
+    ]
+    # no dates, no rights, no US trades
+    assert [stage for stage, seconds in timings.items() if seconds is None] == [
+        "rights",
+        "ptax",
+        "us_trades",
+        "positions",
+        "us_positions",
+    ]
+
+    wb = FileWorkbook(path)
+    assert_frame_equal(
+        wb.trade_confirmations.to_df(), trade_confirmations_with_costs_df, check_like=True
+    )
+    assert_frame_equal(wb.trades.to_df(), trades_with_costs_df, check_like=True)
+    assert_frame_equal(wb.us_dividends.to_df()[us_dividends_ptax_df.columns], us_dividends_ptax_df)
+
+
+def test_run_portfolio_error(portfolio):
+    path = portfolio("a")
+    (path / "rights.csv").write_text("Data\n2022-01-01\n")
+
+    timings, errors = run_portfolio(path)
+
+    assert len(errors) == 1 and errors[0].startswith("rights: ")
+    # only stages that read the failing one are not run
+    assert "positions" not in timings
+    assert timings["trades"] is not None
+    assert timings["us_dividends"] is not None
+
+
+def test_run_portfolio_without_corporate_actions(portfolio):
+    path = portfolio("a")
+    (path / "inputs.json").write_text(json.dumps({"positions": {"date": "2100-01-01"}}))
+
+    timings, errors = run_portfolio(path)
+
+    # no rights, splits, mergers, spin-offs nor stock dividends
+    assert errors == []
+    assert timings["positions"] is not None
+    assert not FileWorkbook(path).positions.to_df().empty
+
+
+@mark.parametrize("threads", [1, 4])
+def test_run_portfolio_threads(portfolio, trades_with_costs_df, us_dividends_ptax_df, threads):
+    path = portfolio("a")
+
+    timings, errors = run_portfolio(path, threads=threads)
+
+    assert errors == []
+    # in the order of stages, whatever order they ran
+    assert list(timings) == [stage for stage in STAGES if stage in timings]
+
+    wb = FileWorkbook(path)
+    assert_frame_equal(wb.trades.to_df(), trades_with_costs_df, check_like=True)
+    assert_frame_equal(wb.us_dividends.to_df()[us_dividends_ptax_df.columns], us_dividends_ptax_df)
+
+
+@mark.parametrize("workers", [1, 2])
+def test_main(portfolio, capsys, workers):
+    paths = [portfolio("a"), portfolio("b")]
+
+    assert main([*map(str, paths), "--workers", str(workers)]) == 0
+
+    out = capsys.readouterr().out
+    assert f"{paths[1]} us_dividends" in out
+    assert "wall time" in out
+
+
+def test_main_error(portfolio, capsys):
+    path = portfolio("a")
+    (path / "rights.csv").write_text("Data\n2022-01-01\n")
+
+    assert main([str(path)]) == 1
+    assert "error: rights:" in capsys.readouterr().out
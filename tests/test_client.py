@@ -0,0 +1,51 @@
+import pytest
+
+from stonks.client import HTTPClient
+from stonks.errors import HTTPRequestError
+
+from .ptax_server import PTAXServer
+
+_QS = "?%40dataInicial=%2701-02-2023%27&%40dataFinalCotacao=%2701-06-2023%27"
+
+
+def test_get_reuses_connections():
+    client = HTTPClient()
+
+    with PTAXServer() as server:
+        bodies = [client.get(server.url + _QS) for _ in range(3)]
+        client.close()
+
+    assert bodies[0].startswith(b"cotacaoCompra,cotacaoVenda,dataHoraCotacao\r\n")
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert server.connections == 1
+
+
+def test_get_retries_dropped_connections():
+    client = HTTPClient(retries=2, backoff=0)
+
+    with PTAXServer(failures=2) as server:
+        body = client.get(server.url + _QS)
+        client.close()
+
+    assert body.startswith(b"cotacaoCompra")
+    assert len(server.requests) == 3
+
+
+def test_get_gives_up_after_retries():
+    client = HTTPClient(retries=2, backoff=0)
+
+    with PTAXServer(failures=3) as server:
+        with pytest.raises(ConnectionError):
+            client.get(server.url + _QS)
+        client.close()
+
+    assert len(server.requests) == 3
+
+
+def test_get_with_error_status():
+    client = HTTPClient(retries=2, backoff=0)
+
+    with PTAXServer() as server:
+        with pytest.raises(HTTPRequestError, match="request failed with status 404"):
+            client.get(server.url.replace("CotacaoDolarPeriodo", "Unknown") + _QS)
+        client.close()
@@ -0,0 +1,93 @@
+import json
+import threading
+from multiprocessing.connection import Listener
+
+from pytest import fixture, raises
+
+import stonks.remote
+from stonks.daemon import Daemon
+from stonks.fingerprints import Fingerprints
+from stonks.mapping import SHEET_NAMES
+
+from .fake_xlwings import make_book
+from .helpers import wait_until
+
+
+@fixture
+def book(monkeypatch, tmp_path, us_dividends_df, ptax_df):
+    book, _ = make_book({"us_dividends": us_dividends_df, "ptax": ptax_df})
+    monkeypatch.setattr("stonks.xlwings._fingerprints", Fingerprints(tmp_path / "fp.json"))
+    monkeypatch.setattr("stonks.remote.DAEMON_PATH", tmp_path / "daemon.json")
+    return book
+
+
+@fixture
+def daemon(tmp_path, book):
+    daemon = Daemon(tmp_path / "daemon.json", open_book={"Book.xlsx": book}.__getitem__)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+
+    wait_until(daemon.path.exists)
+
+    yield daemon
+
+    daemon.close()
+    thread.join()
+
+
+def message(book, table_name):
+    return book.sheets[SHEET_NAMES[table_name]].range("message_box").value
+
+
+def test_call(daemon, book):
+    stonks.remote.call("on_us_dividends_update", "Book.xlsx")
+
+    assert message(book, "us_dividends") == ""
+    assert book.sheets[SHEET_NAMES["us_dividends"]].tables["us_dividends"].grid[1][-1] == 52.30
+
+
+def test_call_unknown_handler(daemon):
+    with raises(RuntimeError, match="unknown handler: _handler"):
+        stonks.remote.call("_handler", "Book.xlsx")
+
+
+def test_call_error(daemon):
+    with raises(RuntimeError, match="Other.xlsx"):
+        stonks.remote.call("on_us_dividends_update", "Other.xlsx")
+
+
+def test_call_connection_closed(tmp_path, book):
+    # a daemon that goes away before replying
+    listener = Listener(("127.0.0.1", 0), authkey=b"key")
+    _, port = listener.address
+    (tmp_path / "daemon.json").write_text(json.dumps({"port": port, "authkey": b"key".hex()}))
+
+    def serve():
+        with listener.accept() as conn:
+            conn.recv()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    try:
+        with raises(RuntimeError, match="daemon closed the connection"):
+            stonks.remote.call("on_us_dividends_update", "Book.xlsx")
+    finally:
+        thread.join()
+        listener.close()
+
+
+def test_call_without_daemon(monkeypatch, book):
+    monkeypatch.setattr("stonks.xlwings.xw.Book.caller", lambda: book)
+
+    stonks.remote.call("on_us_dividends_update", "Book.xlsx")
+
+    assert message(book, "us_dividends") == ""
+
+
+def test_close_removes_daemon_file(daemon):
+    daemon.close()
+
+    wait_until(lambda: not daemon.path.exists())
+
+    assert stonks.remote._connect() is None
@@ -1,7 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import pytest
-from pandas import DataFrame, Series
+from pandas import DataFrame
 from pandas import to_datetime as dt
 from pandas.testing import assert_frame_equal
 
@@ -9,16 +9,20 @@ from stonks.errors import PositionNotOpenError, UnknownEventError
 from stonks.events import (
     buy,
     concat_events,
-    event_fn,
+    event_codes,
     filter_by_date,
+    iter_events,
     merger,
+    replay,
     right,
     sell,
     spin_off,
     split,
     stock_dividend,
+    us_buy,
+    us_sell,
 )
-from stonks.positions import Positions
+from stonks.positions import Positions, USPositions
 
 from .helpers import make_event
 
@@ -52,6 +56,13 @@ def test_filter_by_date(events_df, events_filtered_df):
     assert_frame_equal(result, events_filtered_df)
 
 
+def test_filter_by_date_before_issue_date(events_df):
+    result = filter_by_date(events=events_df, date=date(2022, 1, 10))
+
+    # the right from 2022-01-01 is only issued on 2022-01-15
+    assert result.event.tolist() == ["trade"]
+
+
 def test_buy_new_position():
     positions = Positions()
 
@@ -300,6 +311,7 @@ def test_merger():
         symbol="ABC",
         event="merger",
         ratio="2:1",
+        ratio_value=2.0,
         acquirer="NEWCO",
     )
 
@@ -315,6 +327,7 @@ def test_merger_without_open_position():
         symbol="ABC",
         event="merger",
         ratio="2:1",
+        ratio_value=2.0,
         acquirer="NEWCO",
     )
 
@@ -330,7 +343,9 @@ def test_split():
         [{"symbol": "ABC", "quantity": 100.0, "cost": 109.0, "cost_per_share": 1.09}]
     ).set_index("symbol")
 
-    event = make_event(date=dt("2022-01-05"), symbol="ABC", event="split", ratio="10:1")
+    event = make_event(
+        date=dt("2022-01-05"), symbol="ABC", event="split", ratio="10:1", ratio_value=10.0
+    )
 
     split(positions, event)
 
@@ -339,7 +354,9 @@ def test_split():
 
 def test_split_without_open_position():
     positions = Positions()
-    event = make_event(date=dt("2022-01-05"), symbol="ABC", event="split", ratio="10:1")
+    event = make_event(
+        date=dt("2022-01-05"), symbol="ABC", event="split", ratio="10:1", ratio_value=10.0
+    )
 
     with pytest.raises(PositionNotOpenError, match="position not open: ABC"):
         split(positions, event)
@@ -361,6 +378,7 @@ def test_spin_off():
         symbol="ABC",
         event="spin_off",
         ratio="2:1",
+        ratio_value=2.0,
         new_company="NEWCO",
         cost_basis=0.4,
     )
@@ -377,6 +395,7 @@ def test_spin_off_without_open_position():
         symbol="ABC",
         event="spin_off",
         ratio="2:1",
+        ratio_value=2.0,
         new_company="NEWCO",
         cost_basis=0.4,
     )
@@ -412,21 +431,178 @@ def test_stock_dividend_without_open_position():
         stock_dividend(positions, event)
 
 
-def test_event_fn():
-    event_trade_buy = Series({"event": "trade", "type": "buy"})
-    event_trade_sell = Series({"event": "trade", "type": "sell"})
-    event_right = Series({"event": "right"})
-    event_merger = Series({"event": "merger"})
-    event_split = Series({"event": "split"})
-    event_spin_off = Series({"event": "spin_off"})
-    event_unknown = Series({"event": "foo"})
+def test_us_buy():
+    positions = USPositions()
+
+    expected = DataFrame(
+        [
+            {
+                "symbol": "AAA",
+                "quantity": 16.0,
+                "cost": 196.0,
+                "cost_per_share": 12.25,
+                "cost_brl": 1089.4,
+                "cost_per_share_brl": 68.09,
+            }
+        ]
+    ).set_index("symbol")
+
+    for quantity, amount, amount_brl in [(8.0, 100.0, 558.05), (8.0, 96.0, 531.35)]:
+        event = make_event(
+            date=dt("2022-01-01"),
+            symbol="AAA",
+            type="buy",
+            quantity=quantity,
+            amount=amount,
+            amount_brl=amount_brl,
+            event="trade",
+        )
+        us_buy(positions, event)
+
+    assert_frame_equal(positions.to_df(), expected)
+
+
+def test_us_sell():
+    positions = USPositions()
+    positions.update(
+        "AAA",
+        quantity=16.0,
+        cost=196.0,
+        cost_per_share=12.25,
+        cost_brl=1089.4,
+        cost_per_share_brl=68.0875,
+    )
+
+    expected = DataFrame(
+        [
+            {
+                "symbol": "AAA",
+                "quantity": 11.0,
+                "cost": 134.75,
+                "cost_per_share": 12.25,
+                "cost_brl": 748.96,
+                "cost_per_share_brl": 68.09,
+            }
+        ]
+    ).set_index("symbol")
+
+    event = make_event(
+        date=dt("2022-01-31"),
+        symbol="AAA",
+        type="sell",
+        quantity=5.0,
+        amount=100.0,
+        amount_brl=535.74,
+        event="trade",
+    )
+    us_sell(positions, event)
+
+    assert_frame_equal(positions.to_df(), expected)
+
+
+def test_us_sell_closing_position():
+    positions = USPositions()
+    positions.update(
+        "AAA", quantity=5.0, cost=50.0, cost_per_share=10.0, cost_brl=250.0, cost_per_share_brl=50.0
+    )
+
+    event = make_event(symbol="AAA", type="sell", quantity=5.0, amount=60.0, amount_brl=300.0)
+    us_sell(positions, event)
+
+    assert positions.is_closed("AAA")
+
+
+def test_us_sell_without_an_open_position():
+    event = make_event(symbol="BBB", type="sell", quantity=5.0, amount=60.0, amount_brl=300.0)
+
+    with pytest.raises(PositionNotOpenError, match="position not open: BBB"):
+        us_sell(USPositions(), event)
+
+
+@pytest.mark.parametrize("engine", ["iterrows", "itertuples"])
+def test_replay_unknown_event(engine):
+    events = DataFrame({"event": ["foo"], "symbol": ["AAA"], "date": [dt("2022-01-01")]})
+
+    with pytest.raises(UnknownEventError, match="unknown event type: foo"):
+        replay(Positions(), events, engine)
+
+
+def test_event_codes():
+    events = DataFrame(
+        {
+            "event": ["trade", "trade", "right", "merger", "split", "spin_off", "stock_dividend"],
+            "type": ["buy", "sell", None, None, None, None, None],
+        }
+    )
+
+    assert event_codes(events).tolist() == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_event_codes_with_unknown_event():
+    events = DataFrame({"event": ["trade", "trade", "foo"], "type": ["buy", "bar", None]})
+
+    with pytest.raises(UnknownEventError, match="unknown event type: trade"):
+        event_codes(events)
+
+
+def test_concat_events_with_unsorted_tables(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    events_df,
+    stock_dividends_df,
+):
+    result = concat_events(
+        {
+            "trade": trades_with_costs_df,
+            "right": rights_with_amounts_df,
+            "split": splits_df.iloc[::-1],
+            "merger": mergers_df,
+            "spin_off": spin_offs_df,
+            "stock_dividend": stock_dividends_df,
+        }
+    )
+
+    assert_frame_equal(result, events_df)
 
-    assert event_fn(event_trade_buy) == buy
-    assert event_fn(event_trade_sell) == sell
-    assert event_fn(event_right) == right
-    assert event_fn(event_merger) == merger
-    assert event_fn(event_split) == split
-    assert event_fn(event_spin_off) == spin_off
 
+def test_concat_events_with_unknown_event(splits_df):
     with pytest.raises(UnknownEventError, match="unknown event type: foo"):
-        event_fn(event_unknown)
+        concat_events({"foo": splits_df})
+
+
+@pytest.mark.parametrize("engine", ["iterrows", "itertuples"])
+def test_replay_trade_without_type(engine):
+    events = DataFrame({"event": ["trade"], "symbol": ["AAA"], "date": [dt("2022-01-01")]})
+
+    with pytest.raises(UnknownEventError, match="unknown event type: trade"):
+        replay(Positions(), events, engine)
+
+
+@pytest.mark.parametrize("engine", ["iterrows", "itertuples"])
+def test_iter_events(engine, events_df):
+    events = list(iter_events(events_df, engine))
+
+    # trades by type, other events by event
+    fns = {
+        "buy": buy,
+        "sell": sell,
+        "right": right,
+        "merger": merger,
+        "split": split,
+        "spin_off": spin_off,
+        "stock_dividend": stock_dividend,
+    }
+    expected = [
+        fns[row.type if row.event == "trade" else row.event] for _, row in events_df.iterrows()
+    ]
+
+    assert [fn for fn, _ in events] == expected
+    assert [event.symbol for _, event in events] == events_df.symbol.to_list()
+
+
+def test_iter_events_with_unknown_engine(events_df):
+    with pytest.raises(ValueError, match="unknown engine: foo"):
+        list(iter_events(events_df, "foo"))
@@ -0,0 +1,138 @@
+from pandas.testing import assert_frame_equal
+
+from stonks.calculations import calc_trade_confirmations_costs, calc_us_dividends
+from stonks.excel import Workbook, _runs
+from stonks.mapping import SHEET_NAMES
+
+from .fake_xlwings import make_book
+
+
+def test_runs():
+    assert _runs([]) == []
+    assert _runs([3]) == [(3, 3)]
+    assert _runs([0, 1, 2, 5, 7, 8]) == [(0, 2), (5, 5), (7, 8)]
+
+
+def test_to_df(ptax_df):
+    book, _ = make_book({"ptax": ptax_df})
+
+    assert_frame_equal(Workbook(book).ptax.to_df(), ptax_df)
+
+
+def test_to_df_with_totals(ptax_df):
+    book, _ = make_book({"ptax": ptax_df})
+    table = book.sheets[SHEET_NAMES["ptax"]].tables["ptax"]
+    table.grid.append([None, 10.0, 10.0])
+    table.show_totals = True
+
+    assert_frame_equal(Workbook(book).ptax.to_df(), ptax_df)
+
+
+def test_to_df_empty(ptax_df):
+    book, _ = make_book({"ptax": ptax_df.iloc[:0]})
+
+    df = Workbook(book).ptax.to_df()
+
+    # there are no rows, only the headers
+    assert df.empty
+    assert list(df.columns) == list(ptax_df.columns)
+
+
+def test_update_from_df_adjacent_columns(us_dividends_df, ptax_df, us_dividends_ptax_df):
+    # results of a previous calculation are overwritten
+    us_dividends_df = us_dividends_df.assign(**us_dividends_ptax_df * 2)
+    book, excel = make_book({"us_dividends": us_dividends_df, "ptax": ptax_df})
+    wb = Workbook(book)
+    results = calc_us_dividends(wb.us_dividends.to_df(), wb.ptax.to_df())
+
+    excel.writes = 0
+    wb.us_dividends.update_from_df(results)
+
+    # all 5 columns are adjacent, so they are written at once
+    assert excel.writes == 1
+    assert_frame_equal(wb.us_dividends.to_df(), us_dividends_df.assign(**us_dividends_ptax_df))
+
+
+def test_update_from_df_non_adjacent_columns(trade_confirmations_df, trade_confirmations_costs_df):
+    # results of a previous calculation are overwritten
+    trade_confirmations_df = trade_confirmations_df.assign(**trade_confirmations_costs_df * 2)
+    book, excel = make_book({"trade_confirmations": trade_confirmations_df})
+    wb = Workbook(book)
+    results = calc_trade_confirmations_costs(wb.trade_confirmations.to_df())
+
+    excel.writes = 0
+    wb.trade_confirmations.update_from_df(results)
+
+    # traded volume is apart from costs and amount
+    assert excel.writes == 2
+    assert_frame_equal(
+        wb.trade_confirmations.to_df(),
+        trade_confirmations_df.assign(**trade_confirmations_costs_df),
+        check_like=True,
+    )
+
+
+def test_snapshot(ptax_df, us_dividends_df):
+    book, excel = make_book({"ptax": ptax_df, "us_dividends": us_dividends_df})
+    wb = Workbook(book)
+
+    tables = wb.snapshot(["ptax", "us_dividends"])
+
+    # a read of the headers and one of the data of each table, besides getting
+    # their ranges
+    assert excel.calls == 8
+    assert_frame_equal(tables["ptax"], ptax_df)
+    # results not calculated yet are empty cells
+    assert_frame_equal(tables["us_dividends"].astype(us_dividends_df.dtypes), us_dividends_df)
+
+    # later reads are served from memory, and are copies
+    tables["ptax"].drop(tables["ptax"].index, inplace=True)
+    assert_frame_equal(wb.ptax.to_df(), ptax_df)
+    assert excel.calls == 8
+
+
+def test_update_from_df_invalidates_reads(us_dividends_df, ptax_df):
+    book, _ = make_book({"us_dividends": us_dividends_df, "ptax": ptax_df})
+    wb = Workbook(book)
+    results = calc_us_dividends(wb.us_dividends.to_df(), wb.ptax.to_df())
+
+    wb.us_dividends.update_from_df(results)
+
+    assert_frame_equal(wb.us_dividends.to_df()[results.columns], results)
+
+
+def test_replace_with_df_changed_rows(ptax_df):
+    book, excel = make_book({"ptax": ptax_df})
+    wb = Workbook(book)
+    changed_df = ptax_df.copy()
+    changed_df.iloc[[1, 2, 5], 0] += 1
+
+    excel.writes = 0
+    wb.ptax.replace_with_df(changed_df, index=True)
+
+    # rows 1 and 2 at once and row 5
+    assert excel.writes == 2
+    assert_frame_equal(wb.ptax.to_df(), changed_df)
+
+
+def test_replace_with_df_unchanged(ptax_df):
+    book, excel = make_book({"ptax": ptax_df})
+    wb = Workbook(book)
+
+    excel.writes = 0
+    wb.ptax.replace_with_df(ptax_df, index=True)
+
+    assert excel.writes == 0
+    assert_frame_equal(wb.ptax.to_df(), ptax_df)
+
+
+def test_replace_with_df_resized(ptax_df):
+    book, excel = make_book({"ptax": ptax_df})
+    wb = Workbook(book)
+
+    excel.writes = 0
+    wb.ptax.replace_with_df(ptax_df[1:], index=True)
+
+    # the whole table is replaced
+    assert excel.writes == 1
+    assert_frame_equal(wb.ptax.to_df(), ptax_df[1:])
@@ -0,0 +1,110 @@
+import json
+from datetime import date
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from pytest import fixture, importorskip, mark, raises
+
+from stonks.calculations import calc_positions
+from stonks.files import FileWorkbook
+from stonks.updates import UPDATES
+
+
+@fixture(params=["csv", "parquet", "xlsx"])
+def format(request):
+    if request.param == "parquet":
+        importorskip("pyarrow")
+    elif request.param == "xlsx":
+        importorskip("openpyxl")
+
+    return request.param
+
+
+def test_round_trip(tmp_path, format, trades_with_costs_df, rights_df):
+    FileWorkbook(tmp_path, format).trades.replace_with_df(trades_with_costs_df, index=True)
+    FileWorkbook(tmp_path, format).rights.replace_with_df(rights_df, index=True)
+
+    wb = FileWorkbook(tmp_path, format)
+
+    assert_frame_equal(wb.trades.to_df(), trades_with_costs_df)
+    assert_frame_equal(wb.rights.to_df(), rights_df)
+
+
+def test_layout(tmp_path, trades_df):
+    FileWorkbook(tmp_path).trades.replace_with_df(trades_df, index=True)
+
+    sheet = pd.read_csv(tmp_path / "trades.csv")
+
+    # same headers and values as in the workbook
+    assert list(sheet.columns[:4]) == ["Data", "Corretora", "Código", "Tipo"]
+    assert set(sheet["Tipo"]) == {"C", "V"}
+    assert sheet.Data[0] == "2022-01-01"
+
+
+def test_update_from_df(tmp_path, format, us_dividends_df, us_dividends_ptax_df, ptax_df):
+    FileWorkbook(tmp_path, format).us_dividends.replace_with_df(us_dividends_df, index=True)
+    FileWorkbook(tmp_path, format).ptax.replace_with_df(ptax_df, index=True)
+
+    UPDATES["us_dividends"].run(FileWorkbook(tmp_path, format))
+
+    assert_frame_equal(
+        FileWorkbook(tmp_path, format).us_dividends.to_df(),
+        us_dividends_df.assign(**us_dividends_ptax_df),
+    )
+
+
+def test_date_input_value(tmp_path):
+    (tmp_path / "inputs.json").write_text(json.dumps({"positions": {"date": "2023-12-31"}}))
+
+    assert FileWorkbook(tmp_path).positions.date_input_value("date") == date(2023, 12, 31)
+
+    with raises(KeyError):
+        FileWorkbook(tmp_path).ptax.date_input_value("start_date")
+
+
+@mark.parametrize("empty", [None, "splits", "spin_offs", "stock_dividends"])
+def test_update_positions(
+    tmp_path,
+    empty,
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    tables = {
+        "trades": trades_with_costs_df,
+        "rights": rights_with_amounts_df,
+        "splits": splits_df,
+        "mergers": mergers_df,
+        "spin_offs": spin_offs_df,
+        "stock_dividends": stock_dividends_df,
+    }
+
+    # a portfolio without any of these corporate actions has only the headers
+    # (without mergers, trades of the acquirer would sell a position not open)
+    if empty:
+        tables[empty] = tables[empty].iloc[:0]
+
+    for name, df in tables.items():
+        getattr(FileWorkbook(tmp_path), name).replace_with_df(df, index=True)
+
+    (tmp_path / "inputs.json").write_text(json.dumps({"positions": {"date": "2023-12-31"}}))
+
+    UPDATES["positions"].run(FileWorkbook(tmp_path))
+
+    assert_frame_equal(
+        FileWorkbook(tmp_path).positions.to_df(),
+        calc_positions(date=date(2023, 12, 31), **tables),
+    )
+
+
+def test_read_empty_table(tmp_path, spin_offs_df):
+    FileWorkbook(tmp_path).spin_offs.replace_with_df(spin_offs_df.iloc[:0], index=True)
+
+    df = FileWorkbook(tmp_path).spin_offs.to_df()
+
+    assert df.empty
+    assert df.index.get_level_values("date").dtype == "datetime64[ns]"
+    assert df.cost_basis.dtype == float
@@ -0,0 +1,38 @@
+from datetime import date
+
+from stonks.fingerprints import Fingerprints, fingerprint
+
+
+def test_fingerprint(ptax_df, us_dividends_df):
+    tables = {"ptax": ptax_df, "us_dividends": us_dividends_df}
+    digest = fingerprint(tables, {"date": date(2022, 3, 1)})
+
+    assert fingerprint(dict(reversed(tables.items())), {"date": date(2022, 3, 1)}) == digest
+    assert fingerprint(tables, {"date": date(2022, 3, 2)}) != digest
+    assert fingerprint(tables, {}) != digest
+
+    changed_df = ptax_df.copy()
+    changed_df.iloc[0, 0] += 0.0001
+    assert fingerprint({**tables, "ptax": changed_df}, {"date": date(2022, 3, 1)}) != digest
+
+    renamed_df = ptax_df.rename(columns={"buying_rate": "rate"})
+    assert fingerprint({**tables, "ptax": renamed_df}, {"date": date(2022, 3, 1)}) != digest
+
+
+def test_fingerprints(tmp_path):
+    fingerprints = Fingerprints(tmp_path / "fingerprints.json")
+
+    assert fingerprints.get("ptax") is None
+
+    fingerprints.save("ptax", "abc")
+    fingerprints.save("positions", "def")
+    fingerprints.save("ptax", "ghi")
+
+    assert Fingerprints(tmp_path / "fingerprints.json").get("ptax") == "ghi"
+    assert Fingerprints(tmp_path / "fingerprints.json").get("positions") == "def"
+
+
+def test_fingerprints_corrupted_file(tmp_path):
+    (tmp_path / "fingerprints.json").write_text("{")
+
+    assert Fingerprints(tmp_path / "fingerprints.json").get("ptax") is None
@@ -0,0 +1,79 @@
+import threading
+
+from pytest import mark
+
+from stonks.graph import downstream, propagate
+from stonks.updates import UPDATES
+
+
+def test_downstream():
+    assert downstream(["trade_confirmations"]) == ["trade_confirmations", "trades", "positions"]
+    assert downstream(["ptax"]) == ["ptax", "us_trades", "us_dividends", "us_positions"]
+    # splits have no update
+    assert downstream(["splits"]) == ["positions"]
+    assert downstream(["positions"]) == ["positions"]
+
+
+def test_downstream_of_every_table():
+    tables = downstream(UPDATES)
+
+    assert sorted(tables) == sorted(UPDATES)
+
+    for table in tables:
+        for name in UPDATES[table].inputs:
+            assert name not in tables or tables.index(name) < tables.index(table)
+
+
+@mark.parametrize("workers", [1, 4])
+def test_propagate_runs_each_table_once_after_its_inputs(workers):
+    runs = []
+
+    errors, not_run = propagate(["rights", "trade_confirmations"], runs.append, workers)
+
+    assert errors == {} and not_run == []
+    assert sorted(runs) == ["positions", "rights", "trade_confirmations", "trades"]
+    assert runs.index("trade_confirmations") < runs.index("trades") < runs.index("positions")
+    assert runs.index("rights") < runs.index("positions")
+
+
+@mark.parametrize("workers", [1, 4])
+def test_propagate_skips_tables_reading_failures(workers):
+    runs = []
+
+    def run(table):
+        if table == "us_trades":
+            raise ValueError("oops")
+
+        runs.append(table)
+
+    errors, not_run = propagate(["ptax"], run, workers)
+
+    assert list(errors) == ["us_trades"]
+    assert not_run == ["us_positions"]
+    # an independent branch
+    assert sorted(runs) == ["ptax", "us_dividends"]
+
+
+def test_propagate_runs_independent_branches_concurrently():
+    # both branches must be running at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    threads = {}
+
+    def run(table):
+        threads[table] = threading.current_thread()
+
+        if table in ["us_trades", "us_dividends"]:
+            barrier.wait()
+
+    errors, _ = propagate(["ptax"], run, workers=2)
+
+    assert errors == {}
+    assert threads["us_trades"] is not threads["us_dividends"]
+
+
+def test_propagate_runs_in_calling_thread():
+    threads = set()
+
+    propagate(["ptax"], lambda table: threads.add(threading.current_thread()))
+
+    assert threads == {threading.current_thread()}
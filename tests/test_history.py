@@ -0,0 +1,160 @@
+from datetime import date
+
+import pandas as pd
+from pandas import DataFrame
+from pandas import to_datetime as dt
+from pandas.testing import assert_frame_equal
+from pytest import fixture, mark
+
+from stonks.calculations import calc_positions_history, calc_us_positions_history
+from stonks.events import concat_events, filter_by_date, replay
+from stonks.history import replay_history
+from stonks.positions import Positions
+
+
+def replay_at(events, day):
+    positions = Positions()
+    replay(positions, filter_by_date(events=events, date=day))
+
+    return positions.to_df()
+
+
+def history_at_every_day(events, days):
+    return {
+        day: positions.to_df()
+        for day, positions in replay_history(Positions(), events, replay, days)
+    }
+
+
+def test_replay_history(events_df):
+    days = pd.date_range("2021-12-31", "2022-04-05")
+
+    history = history_at_every_day(events_df, days)
+
+    assert list(history) == list(days)
+
+    for day in days:
+        assert_frame_equal(history[day], replay_at(events_df, day))
+
+
+def test_replay_history_with_right_issued_after_other_events():
+    trades = DataFrame(
+        [
+            {
+                "date": dt("2022-01-01"),
+                "symbol": "AAA",
+                "type": "buy",
+                "quantity": 10.0,
+                "amount": 100.0,
+            },
+            {
+                "date": dt("2022-01-05"),
+                "symbol": "AAA",
+                "type": "sell",
+                "quantity": 5.0,
+                "amount": 80.0,
+            },
+            {
+                "date": dt("2022-01-12"),
+                "symbol": "BBB",
+                "type": "buy",
+                "quantity": 1.0,
+                "amount": 10.0,
+            },
+        ]
+    ).set_index("date")
+    rights = DataFrame(
+        [
+            {
+                "date": dt("2022-01-02"),
+                "symbol": "AAA",
+                "exercised": 10.0,
+                "amount": 50.0,
+                "issue_date": dt("2022-01-10"),
+            },
+            {
+                "date": dt("2022-01-03"),
+                "symbol": "AAA",
+                "exercised": 10.0,
+                "amount": 20.0,
+                "issue_date": dt("2022-01-15"),
+            },
+        ]
+    ).set_index("date")
+    events = concat_events({"trade": trades, "right": rights})
+    days = pd.date_range("2022-01-01", "2022-01-20")
+
+    history = history_at_every_day(events, days)
+
+    for day in days:
+        assert_frame_equal(history[day], replay_at(events, day))
+
+    assert history[dt("2022-01-09")].loc["AAA"].quantity == 5.0
+    assert history[dt("2022-01-10")].loc["AAA"].quantity == 15.0
+    assert history[dt("2022-01-15")].loc["AAA"].quantity == 25.0
+
+
+def test_replay_history_without_dates(events_df):
+    days = [day for day, _ in replay_history(Positions(), events_df, replay)]
+
+    assert days == list(
+        dt(
+            [
+                "2022-01-01",
+                "2022-01-15",
+                "2022-01-31",
+                "2022-02-01",
+                "2022-02-15",
+                "2022-02-28",
+                "2022-03-01",
+                "2022-03-15",
+                "2022-03-31",
+                "2022-04-01",
+                "2022-04-02",
+            ]
+        )
+    )
+
+
+@fixture
+def positions_inputs(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    return {
+        "trades": trades_with_costs_df,
+        "rights": rights_with_amounts_df,
+        "splits": splits_df,
+        "mergers": mergers_df,
+        "spin_offs": spin_offs_df,
+        "stock_dividends": stock_dividends_df,
+    }
+
+
+def test_calc_positions_history_without_dates(positions_inputs):
+    history = calc_positions_history(dates=[], **positions_inputs)
+
+    assert history.empty
+    assert list(history.columns) == ["date", "symbol", "quantity", "cost", "cost_per_share"]
+    assert history.date.dtype == "datetime64[ns]"
+
+
+@mark.parametrize("dates", [None, [date(2022, 1, 10)]])
+def test_calc_positions_history_without_events(positions_inputs, dates):
+    empty = {name: df.iloc[:0] for name, df in positions_inputs.items()}
+
+    history = calc_positions_history(dates=dates, **empty)
+
+    assert history.empty
+    assert list(history.columns) == ["date", "symbol", "quantity", "cost", "cost_per_share"]
+
+
+def test_calc_us_positions_history_without_dates(us_trades_with_ptax_df):
+    history = calc_us_positions_history(dates=[], trades=us_trades_with_ptax_df)
+
+    assert history.empty
+    assert "cost_brl" in history
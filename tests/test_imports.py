@@ -0,0 +1,40 @@
+import statistics
+
+from .helpers import import_times
+
+# Budget for the time spent running the modules of stonks themselves (not
+# pandas or xlwings) when Excel imports stonks.xlwings. It was about 20 ms when
+# lazy imports were introduced, the budget leaves room for loaded machines (see
+# benchmarks/imports.py for a tighter one).
+STONKS_BUDGET_MS = 150
+
+
+def test_handlers_import_neither_pandera_nor_calculations():
+    times = import_times("stonks.xlwings")
+
+    for module in [
+        "pandera",
+        "stonks.schemas",
+        "stonks.bcb",
+        "stonks.checkpoints",
+        "stonks.events",
+        "stonks.positions",
+        "stonks.prefetch",
+    ]:
+        assert module not in times
+
+
+def test_ptax_does_not_import_positions():
+    times = import_times("stonks.bcb")
+
+    assert "stonks.events" not in times
+    assert "stonks.positions" not in times
+
+
+def test_import_time_budget():
+    stonks_ms = [
+        sum(self_us for name, (self_us, _) in times.items() if name.startswith("stonks")) / 1000
+        for times in (import_times("stonks.xlwings") for _ in range(3))
+    ]
+
+    assert statistics.median(stonks_ms) < STONKS_BUDGET_MS
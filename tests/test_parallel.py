@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from stonks.calculations import calc_positions
+from stonks.checkpoints import Checkpoints
+from stonks.parallel import replay_in_parallel, symbol_groups
+
+
+def test_symbol_groups(events_df):
+    groups = {}
+
+    for symbol, group in zip(events_df.symbol, symbol_groups(events_df), strict=True):
+        groups.setdefault(group, set()).add(symbol)
+
+    # CCC was merged into NEWCO, every other symbol is on its own
+    assert sorted(sorted(symbols) for symbols in groups.values()) == [
+        ["AAA"],
+        ["ABC3"],
+        ["BBB"],
+        ["CCC", "NEWCO"],
+        ["DDD"],
+        ["EEE"],
+        ["FFF"],
+    ]
+
+
+def test_replay_in_parallel_without_events(events_df):
+    assert replay_in_parallel(events_df.iloc[0:0], "itertuples", workers=2).empty
+
+
+def test_calc_positions_in_parallel(
+    positions_df,
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    actual_positions = calc_positions(
+        date=date.today(),
+        trades=trades_with_costs_df,
+        rights=rights_with_amounts_df,
+        splits=splits_df,
+        mergers=mergers_df,
+        spin_offs=spin_offs_df,
+        stock_dividends=stock_dividends_df,
+        workers=2,
+    )
+
+    assert_frame_equal(actual_positions, positions_df)
+
+
+def test_calc_positions_in_parallel_with_checkpoints(
+    trades_with_costs_df,
+    rights_with_amounts_df,
+    splits_df,
+    mergers_df,
+    spin_offs_df,
+    stock_dividends_df,
+):
+    with pytest.raises(ValueError, match="checkpoints cannot be used with workers"):
+        calc_positions(
+            date=date.today(),
+            trades=trades_with_costs_df,
+            rights=rights_with_amounts_df,
+            splits=splits_df,
+            mergers=mergers_df,
+            spin_offs=spin_offs_df,
+            stock_dividends=stock_dividends_df,
+            checkpoints=Checkpoints(),
+            workers=2,
+        )
@@ -0,0 +1,42 @@
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+
+from stonks.positions import Positions
+
+
+def test_update_in_place():
+    positions = Positions()
+    positions.update("AAA", quantity=1.0, cost=10.0, cost_per_share=10.0)
+    position = positions.find("AAA")
+
+    positions.update("AAA", quantity=2.0, cost=30.0, cost_per_share=15.0)
+
+    assert positions.find("AAA") is position
+    assert position.quantity == 2.0
+
+
+def test_copy():
+    positions = Positions()
+    positions.update("AAA", quantity=1.0, cost=10.0, cost_per_share=10.0)
+
+    copied = positions.copy()
+    positions.update("AAA", quantity=2.0, cost=30.0, cost_per_share=15.0)
+    positions.update("BBB", quantity=1.0, cost=5.0, cost_per_share=5.0)
+
+    assert copied.find("AAA").quantity == 1.0
+    assert copied.is_closed("BBB")
+
+
+def test_to_df():
+    positions = Positions()
+    positions.update("BBB", quantity=3.0, cost=10.0, cost_per_share=3.3333)
+    positions.update("AAA", quantity=1.0, cost=10.554, cost_per_share=10.554)
+
+    expected = DataFrame(
+        [
+            {"symbol": "AAA", "quantity": 1.0, "cost": 10.55, "cost_per_share": 10.55},
+            {"symbol": "BBB", "quantity": 3.0, "cost": 10.0, "cost_per_share": 3.33},
+        ]
+    ).set_index("symbol")
+
+    assert_frame_equal(positions.to_df(), expected)
@@ -0,0 +1,82 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from pandas.testing import assert_frame_equal
+
+from stonks import bcb
+from stonks.bcb import fetch_ptax_usd
+from stonks.prefetch import PTAXPrefetcher
+from stonks.store import PTAXStore
+
+from .helpers import wait_until
+
+
+def wait_for_downloads():
+    wait_until(lambda: any(bcb._in_flight.values()))
+
+
+def test_prefetch(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    prefetcher = PTAXPrefetcher(store)
+
+    prefetcher.prefetch(date(2023, 1, 1)).result()
+    requests = len(ptax_server.requests)
+
+    results = fetch_ptax_usd(date(2023, 3, 1), date(2023, 6, 30), store=store)
+
+    # answered from the store
+    assert len(ptax_server.requests) == requests
+    assert_frame_equal(results, fetch_ptax_usd(date(2023, 3, 1), date(2023, 6, 30)))
+
+
+def test_fetch_while_prefetching(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    prefetcher = PTAXPrefetcher(store)
+    ptax_server.latency = 0.1
+
+    prefetch = prefetcher.prefetch(date(2023, 1, 1))
+    wait_for_downloads()
+    # the handler waits for the dates being prefetched and only downloads the
+    # dates before them
+    fetch_ptax_usd(date(2022, 12, 1), date(2023, 6, 30), store=store)
+    prefetch.result()
+
+    assert len(ptax_server.requests) == len(set(ptax_server.requests))
+    assert [r for r in ptax_server.requests if r[1] < date(2022, 12, 25)] == [
+        ("USD", date(2022, 11, 24), date(2022, 12, 24))
+    ]
+
+
+def test_concurrent_fetches(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    ptax_server.latency = 0.1
+    results = []
+
+    def fetch():
+        results.append(fetch_ptax_usd(date(2020, 1, 1), date(2022, 12, 31), store=store))
+
+    threads = [threading.Thread(target=fetch) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every chunk is downloaded once
+    assert len(ptax_server.requests) == 4
+    assert_frame_equal(results[0], results[1])
+    assert_frame_equal(results[0], results[2])
+
+
+def test_schedule(ptax_server, tmp_path):
+    store = PTAXStore(tmp_path / "ptax.sqlite3")
+    prefetcher = PTAXPrefetcher(store)
+    today = date.today()
+
+    prefetcher.schedule(today - timedelta(days=30), interval=timedelta(seconds=0.01))
+
+    # today is not covered by the store, so it is requested on every run
+    while ptax_server.requests.count(("USD", today, today)) < 2:
+        time.sleep(0.01)
+
+    prefetcher.stop()
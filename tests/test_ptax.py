@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+from pandas import to_datetime as dt
+
+from stonks.ptax import PTAXIndex
+
+
+def test_ptax_index(ptax_df):
+    index = PTAXIndex(ptax_df)
+    dates = ptax_df.index[[5, 0, 5, -1]]
+
+    assert_array_equal(index.buying_rates(dates), ptax_df.buying_rate.iloc[[5, 0, 5, -1]])
+    assert_array_equal(index.selling_rates(dates), ptax_df.selling_rate.iloc[[5, 0, 5, -1]])
+
+
+def test_ptax_index_with_missing_dates():
+    ptax = pd.DataFrame(
+        {"buying_rate": [5.3, 5.1], "selling_rate": [5.4, 5.2]},
+        index=pd.DatetimeIndex(dt(["2023-01-04", "2023-01-02"]), name="date"),
+    )
+    index = PTAXIndex(ptax)
+    # missing dates get the last rate before them, dates out of the table get NaN
+    dates = dt(["2023-01-01", "2023-01-02", "2023-01-03", "2023-01-04", "2023-01-05", None])
+
+    assert_array_equal(index.selling_rates(dates), [np.nan, 5.2, 5.2, 5.4, np.nan, np.nan])
+
+
+def test_ptax_index_empty():
+    ptax = pd.DataFrame(
+        {"buying_rate": [], "selling_rate": []},
+        index=pd.DatetimeIndex([], name="date"),
+    )
+
+    assert_array_equal(PTAXIndex(ptax).buying_rates(dt(["2023-01-01"])), [np.nan])
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pandas as pd
+from pandas import to_datetime as dt
+from pandas.testing import assert_frame_equal
+from pytest import fixture
+
+from stonks.store import PTAXStore
+
+
+@fixture
+def store(tmp_path):
+    return PTAXStore(tmp_path / "ptax.sqlite3")
+
+
+def quotes_df(dates, rates):
+    return pd.DataFrame(
+        {"buying_rate": rates, "selling_rate": [rate + 0.0006 for rate in rates]},
+        index=pd.DatetimeIndex(dt(dates), name="date"),
+    )
+
+
+def test_missing_when_empty(store):
+    assert store.missing("USD", date(2023, 1, 1), date(2023, 1, 31)) == [
+        (date(2023, 1, 1), date(2023, 1, 31))
+    ]
+
+
+def test_missing_with_gaps(store):
+    store.save("USD", date(2023, 1, 5), date(2023, 1, 10), quotes_df([], []))
+    store.save("USD", date(2023, 1, 20), date(2023, 2, 10), quotes_df([], []))
+
+    assert store.missing("USD", date(2023, 1, 1), date(2023, 1, 31)) == [
+        (date(2023, 1, 1), date(2023, 1, 4)),
+        (date(2023, 1, 11), date(2023, 1, 19)),
+    ]
+    assert store.missing("USD", date(2023, 1, 6), date(2023, 1, 9)) == []
+    # coverage is recorded per currency
+    assert store.missing("EUR", date(2023, 1, 6), date(2023, 1, 9)) == [
+        (date(2023, 1, 6), date(2023, 1, 9))
+    ]
+
+
+def test_save_merges_adjacent_ranges(store):
+    store.save("USD", date(2023, 1, 1), date(2023, 1, 10), quotes_df([], []))
+    store.save("USD", date(2023, 1, 21), date(2023, 1, 31), quotes_df([], []))
+    store.save("USD", date(2023, 1, 11), date(2023, 1, 20), quotes_df([], []))
+
+    with store._connect() as conn:
+        coverage = conn.execute("SELECT * FROM coverage").fetchall()
+
+    assert coverage == [("USD", "2023-01-01", "2023-01-31")]
+
+
+def test_quotes(store):
+    store.save(
+        "USD",
+        date(2023, 1, 1),
+        date(2023, 1, 31),
+        quotes_df(["2023-01-30", "2023-01-02", "2023-01-31"], [5.0953, 5.343, 5.0987]),
+    )
+    # quotes saved again replace the previous ones
+    store.save("USD", date(2023, 1, 31), date(2023, 1, 31), quotes_df(["2023-01-31"], [5.0988]))
+
+    assert_frame_equal(
+        store.quotes("USD", date(2023, 1, 2), date(2023, 1, 31)),
+        quotes_df(["2023-01-02", "2023-01-30", "2023-01-31"], [5.343, 5.0953, 5.0988]),
+    )
+    assert store.quotes("USD", date(2023, 2, 1), date(2023, 2, 28)).empty
@@ -1,14 +1,41 @@
 from datetime import date
 
-from stonks.utils import previous_month_15th, ratio_to_float, reverse_dict
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from pandas import Series
+from pandas.testing import assert_series_equal
 
+from stonks.errors import InvalidRatioError
+from stonks.utils import (
+    previous_month_15th,
+    previous_months_15th,
+    ratios_to_float,
+    reverse_dict,
+)
 
-def test_ratio_to_float():
-    assert ratio_to_float("1:1") == 1
-    assert ratio_to_float("4:1") == 4
-    assert ratio_to_float("1:4") == 0.25
-    assert ratio_to_float("1,25:1") == 1.25
-    assert ratio_to_float("1:1,25") == 0.8
+
+def test_ratios_to_float():
+    ratios = Series(["1:1", "4:1", "1:4", "1,25:1", "1:1,25"], index=[3, 5, 7, 9, 11])
+
+    assert_series_equal(
+        ratios_to_float(ratios, "Splits"), Series([1, 4, 0.25, 1.25, 0.8], index=ratios.index)
+    )
+
+
+def test_ratios_to_float_empty():
+    assert_series_equal(ratios_to_float(Series([], dtype=str), "Splits"), Series([], dtype=float))
+
+
+def test_ratios_to_float_invalid():
+    ratios = Series(["1:1", "1:0", "2:1", "abc", "1:2:3", "4", "-1:2"])
+
+    with pytest.raises(
+        InvalidRatioError,
+        match=r"invalid ratios in Splits: '1:0' \(row 1\), 'abc' \(row 3\), '1:2:3' \(row 4\), "
+        r"'4' \(row 5\), '-1:2' \(row 6\)",
+    ):
+        ratios_to_float(ratios, "Splits")
 
 
 def test_reverse_dict():
@@ -21,3 +48,12 @@ def test_previous_month_15th():
     assert previous_month_15th(date(2022, 1, 31)) == date(2021, 12, 15)
     assert previous_month_15th(date(2022, 2, 28)) == date(2022, 1, 15)
     assert previous_month_15th(date(2022, 12, 31)) == date(2022, 11, 15)
+
+
+def test_previous_months_15th():
+    dates = np.array(["2023-01-01", "2023-03-31", "2024-03-15", "NaT"], dtype="datetime64[ns]")
+
+    assert_array_equal(
+        previous_months_15th(dates),
+        np.array(["2022-12-15", "2023-02-15", "2024-02-15", "NaT"], dtype="datetime64[D]"),
+    )
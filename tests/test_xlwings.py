@@ -0,0 +1,127 @@
+from datetime import date
+
+from pytest import fixture
+
+import stonks.xlwings
+from stonks.fingerprints import Fingerprints
+from stonks.mapping import SHEET_NAMES
+
+from .fake_xlwings import make_book
+
+
+@fixture
+def book(monkeypatch, tmp_path, us_dividends_df, ptax_df):
+    book, excel = make_book({"us_dividends": us_dividends_df, "ptax": ptax_df})
+    monkeypatch.setattr("stonks.xlwings.xw.Book.caller", lambda: book)
+    monkeypatch.setattr("stonks.xlwings._fingerprints", Fingerprints(tmp_path / "fp.json"))
+    return book, excel
+
+
+def message(book, table_name):
+    return book.sheets[SHEET_NAMES[table_name]].range("message_box").value
+
+
+def test_handler_skips_unchanged_inputs(book):
+    book, excel = book
+
+    stonks.xlwings.on_us_dividends_update()
+    assert message(book, "us_dividends") == ""
+    assert excel.writes > 0
+
+    excel.writes = 0
+    stonks.xlwings.on_us_dividends_update()
+
+    assert message(book, "us_dividends") == "skipped: inputs unchanged"
+    # only the message box is written
+    assert excel.writes == 2
+
+
+def test_handler_runs_when_inputs_change(book):
+    book, excel = book
+
+    stonks.xlwings.on_us_dividends_update()
+
+    # a PTAX rate is changed
+    book.sheets[SHEET_NAMES["ptax"]].tables["ptax"].grid[1][1] = 1.0
+    excel.writes = 0
+    stonks.xlwings.on_us_dividends_update()
+
+    assert message(book, "us_dividends") == ""
+    assert excel.writes > 2
+
+
+def test_handler_runs_when_results_are_cleared(book):
+    book, excel = book
+
+    stonks.xlwings.on_us_dividends_update()
+
+    for row in book.sheets[SHEET_NAMES["us_dividends"]].tables["us_dividends"].grid[1:]:
+        row[-1] = None
+
+    excel.writes = 0
+    stonks.xlwings.on_us_dividends_update()
+
+    assert message(book, "us_dividends") == ""
+    assert excel.writes > 2
+
+
+def test_handler_failure_is_not_fingerprinted(book, monkeypatch):
+    book, excel = book
+
+    def fail(**kwargs):
+        raise ValueError("oops")
+
+    monkeypatch.setattr("stonks.calculations.calc_us_dividends", fail)
+    stonks.xlwings.on_us_dividends_update()
+    assert message(book, "us_dividends") == "error: oops"
+    assert stonks.xlwings._fingerprints.get("us_dividends") is None
+
+
+@fixture
+def us_book(
+    monkeypatch, tmp_path, us_trades_with_ptax_df, us_positions_df, us_dividends_df, ptax_df
+):
+    book, excel = make_book(
+        {
+            # results are prefilled, so their columns are not empty
+            "us_trades": us_trades_with_ptax_df,
+            "us_positions": us_positions_df,
+            "us_dividends": us_dividends_df,
+            "ptax": ptax_df,
+        },
+        cells={"us_positions": {"date": date(2100, 1, 1)}},
+    )
+    monkeypatch.setattr("stonks.xlwings.xw.Book.caller", lambda: book)
+    monkeypatch.setattr("stonks.xlwings._fingerprints", Fingerprints(tmp_path / "fp.json"))
+    return book
+
+
+def test_handler_updates_tables_reading_it(us_book):
+    stonks.xlwings.on_us_trades_update()
+
+    assert message(us_book, "us_trades") == ""
+    assert message(us_book, "us_positions") == ""
+    assert stonks.xlwings._fingerprints.get("us_positions") is not None
+    # does not read US trades
+    assert stonks.xlwings._fingerprints.get("us_dividends") is None
+
+
+def test_handler_skips_tables_reading_failures(us_book, monkeypatch):
+    def fail(**kwargs):
+        raise ValueError("oops")
+
+    monkeypatch.setattr("stonks.calculations.calc_us_trades", fail)
+    stonks.xlwings.on_us_trades_update()
+
+    assert message(us_book, "us_trades") == "error: oops"
+    assert message(us_book, "us_positions") == "skipped: inputs failed"
+    assert stonks.xlwings._fingerprints.get("us_positions") is None
+
+
+def test_workbook_open_without_start_date(book):
+    book, _ = book
+
+    # the PTAX start date is empty
+    stonks.xlwings.on_workbook_open()
+
+    assert message(book, "ptax").startswith("error: ")